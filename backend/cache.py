@@ -0,0 +1,99 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from django.core.cache import cache
+from django.db import transaction
+
+# Namespace-versioned cache keys.
+#
+# Every namespace ("products", "categories", ...) owns a generation counter
+# and cached keys embed the generations they depend on. Invalidating a
+# namespace is a single INCR; entries built against an older generation are
+# never read again and simply expire.
+
+PRODUCTS = "products"
+CATEGORIES = "categories"
+RATINGS = "ratings"
+
+_local = threading.local()
+
+
+def _counter_key(namespace):
+    return f"gen:{namespace}"
+
+
+def _initial_generation():
+    # Seeded from the clock so a counter that was evicted never restarts at
+    # a value an older, still cached entry was built against.
+    return time.time_ns() // 1000
+
+
+def get_generations(*namespaces):
+    keys = {_counter_key(ns): ns for ns in namespaces}
+    found = cache.get_many(keys.keys())
+    generations = {}
+    for key, ns in keys.items():
+        value = found.get(key)
+        if value is None:
+            cache.add(key, _initial_generation(), timeout=None)
+            value = cache.get(key)
+        generations[ns] = value
+    return generations
+
+
+def versioned_key(key, *namespaces):
+    """Return `key` suffixed with the current generation of each namespace."""
+    generations = get_generations(*namespaces)
+    return ":".join([key, *(f"{ns}{generations[ns]}" for ns in namespaces)])
+
+
+def _bump(namespaces):
+    for ns in namespaces:
+        key = _counter_key(ns)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), timeout=None)
+
+
+def invalidate(*namespaces):
+    """
+    Bump the generation of each namespace.
+    Inside a transaction the bump is applied on commit; inside
+    `suppress_invalidation()` bumps are held until the block exits.
+    """
+    if getattr(_local, "suppressed", None) is not None:
+        _local.suppressed.update(namespaces)
+        return
+
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _bump(namespaces)
+        return
+
+    # Every call registers its own bump rather than sharing one: bumping a
+    # counter twice is harmless, and the last bump then always runs after
+    # the on_commit hooks registered before it (e.g. card rebuilds), so
+    # nothing is recached from stale rows. Bumps are dropped with their
+    # transaction or savepoint when it rolls back.
+    transaction.on_commit(partial(_bump, namespaces))
+
+
+@contextmanager
+def suppress_invalidation():
+    """
+    Collect invalidations for the duration of the block (e.g. a bulk import)
+    and apply each namespace once when it ends.
+    """
+    if getattr(_local, "suppressed", None) is not None:
+        yield
+        return
+
+    _local.suppressed = set()
+    try:
+        yield
+    finally:
+        namespaces, _local.suppressed = _local.suppressed, None
+        if namespaces:
+            invalidate(*namespaces)
@@ -0,0 +1,16 @@
+def values_table(alias, columns, rows):
+    """
+    Render rows as an inline VALUES table for raw SQL.
+
+    columns is a list of (name, sql_type) pairs; every placeholder is cast
+    so Postgres never has to guess parameter types.
+
+        values_table('x', [('id', 'integer'), ('qty', 'integer')], [(1, 2), (5, 0)])
+        -> ('(VALUES (%s::integer, %s::integer), (%s::integer, %s::integer)) AS x (id, qty)',
+            [1, 2, 5, 0])
+    """
+    row_sql = "(" + ", ".join(f"%s::{sql_type}" for _, sql_type in columns) + ")"
+    names = ", ".join(name for name, _ in columns)
+    sql = f"(VALUES {', '.join([row_sql] * len(rows))}) AS {alias} ({names})"
+    params = [value for row in rows for value in row]
+    return sql, params
@@ -2,6 +2,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
+from celery.schedules import crontab
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
@@ -189,6 +191,7 @@ REST_FRAMEWORK = {
         'register': '5/minute',
         'send_otp': '3/minute',
         'verify_otp': '5/minute',
+        'suggest': '120/minute',
     },
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -276,6 +279,22 @@ CACHES = {
     }
 }
 
+# Guest carts live in Redis until login (see cart/storage.py).
+# Set to None to keep them as Cart rows in the database.
+CART_GUEST_STORAGE = "cart.storage.RedisGuestCart"
+CART_GUEST_TTL = 60 * 60 * 24 * 30  # sliding, matches the guest_id cookie
+# Add-to-cart holds stock for this long (products/services/reservations.py)
+STOCK_RESERVATION_TTL = 60 * 15
+# Database guest carts idle this long are purged (cart.tasks)
+CART_GUEST_MAX_AGE = timedelta(days=30)
+CART_PURGE_BATCH_SIZE = 1000
+# Checkout quotes (POST /orders/quote/) stay valid this long
+ORDER_QUOTE_TTL = 60 * 5
+# Invoice numbers: INV-000001, or INV-2026-000001 when numbering restarts yearly
+INVOICE_NUMBER_PREFIX = "INV"
+INVOICE_NUMBER_YEARLY = False
+INVOICE_NUMBER_PADDING = 6
+
 # Google OAuth2 keys
 SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = os.environ.get('SOCIAL_AUTH_GOOGLE_OAUTH2_KEY')
 SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = os.environ.get('SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET')
@@ -308,6 +327,8 @@ PAYPAL_API_BASE = os.environ.get('PAYPAL_API_BASE')
 PAYPAL_CURRENCY = os.environ.get('PAYPAL_CURRENCY')
 PAYMENT_RETURN_URL = FRONTEND_URL + "/payment/success"
 PAYMENT_CANCEL_URL = FRONTEND_URL + "/payment/cancel"
+# Seconds any single payment provider request may take (checkout and callbacks)
+PAYMENT_GATEWAY_TIMEOUT = 10
 
 # Paymob keys
 PAYMOB_API_KEY = os.environ.get('PAYMOB_API_KEY')
@@ -359,6 +380,11 @@ LOGGING = {
         "level": "WARNING",
     },
     "loggers": {
+        "cart.tasks": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
         "django.security": {
             "handlers": ["console"],
             "level": "WARNING",
@@ -375,3 +401,22 @@ LOGGING = {
 # save Celery task results in Django's database
 CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/1"
 CELERY_BROKER_URL="redis://127.0.0.1:6379/1"
+
+CELERY_BEAT_SCHEDULE = {
+    "reconcile-rating-summaries": {
+        "task": "products.tasks.reconcile_rating_summaries_task",
+        "schedule": crontab(minute=30, hour=3),
+    },
+    "reap-expired-stock-holds": {
+        "task": "products.tasks.reap_expired_stock_holds",
+        "schedule": timedelta(minutes=1),
+    },
+    "purge-abandoned-guest-carts": {
+        "task": "cart.tasks.purge_abandoned_guest_carts",
+        "schedule": crontab(minute=0, hour=4),
+    },
+    "refresh-recent-vendor-sales": {
+        "task": "orders.tasks.refresh_recent_vendor_sales",
+        "schedule": crontab(minute=15, hour=2),
+    },
+}
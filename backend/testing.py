@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.test import TestCase
+from accounts.models import User, VendorProfile
+from products.models import Brand, Category, Product, ProductVariant
+
+PASSWORD = 'pw12345678'
+
+
+class CatalogTestCase(TestCase):
+    """
+    A vendor with a store, a buyer, and one product ("Phone") with a
+    single default variant (5 in stock). The cache, which also holds
+    stock holds, quotes and generations, starts empty for every test.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = cls.make_user('vendor', role=User.VENDOR)
+        VendorProfile.objects.create(user=cls.vendor, store_name='Acme Store')
+        cls.buyer = cls.make_user('buyer')
+        cls.category = Category.objects.create(name='Phones', vendor=cls.vendor)
+        cls.brand = Brand.objects.create(name='Acme')
+        cls.product = cls.make_product('Phone')
+        cls.variant = cls.make_variant(cls.product)
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def make_user(cls, username, **extra):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com', password=PASSWORD, **extra
+        )
+
+    @classmethod
+    def make_product(cls, name, category=None, brand=None):
+        return Product.objects.create(
+            vendor=cls.vendor, category=category or cls.category, brand=brand or cls.brand,
+            name=name, condition='new', description=f'A {name.lower()}',
+        )
+
+    @classmethod
+    def make_variant(cls, product, price='100.00', stock=5, **extra):
+        # SKUs are generated on save; the first variant must be the default.
+        extra.setdefault('is_default', not product.variants.exists())
+        return ProductVariant.objects.create(product=product, price=price, stock=stock, **extra)
@@ -23,6 +23,7 @@ from orders.views import (
     VendorOrderListView, VendorOrderDetailView,
     VendorPaymentListView, VendorPaymentDetailView,
     VendorInvoiceListView, VendorInvoiceDetailView,
+    VendorSalesAnalyticsView, VendorProductAnalyticsView,
 )
 
 # Products
@@ -66,5 +67,9 @@ urlpatterns = [
     # Invoice
     path("invoices/", VendorInvoiceListView.as_view()),
     path("invoices/<int:pk>/", VendorInvoiceDetailView.as_view()),
+    
+    # Analytics
+    path("analytics/sales/", VendorSalesAnalyticsView.as_view()),
+    path("analytics/products/", VendorProductAnalyticsView.as_view()),
 ]
 urlpatterns += router.urls
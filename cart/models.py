@@ -26,6 +26,16 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Abandoned guest cart purge (cart.tasks)
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(user__isnull=True),
+                name='cart_guest_updated_at_idx',
+            ),
+        ]
+    
     def __str__(self):
         return f"Cart({self.user or self.guest_id})"
     
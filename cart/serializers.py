@@ -1,8 +1,10 @@
 from decimal import Decimal
-from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from products.models import ProductVariant
 from .models import Cart, CartItem, WishlistItem
+from .utils import add_to_cart
 from products.serializers import ProductImageSerializer
 from drf_spectacular.utils import extend_schema_field, inline_serializer, OpenApiTypes
 
@@ -10,7 +12,7 @@ from drf_spectacular.utils import extend_schema_field, inline_serializer, OpenAp
 class WishlistVariantSerializer(serializers.ModelSerializer):
     name = serializers.CharField(source='product.name', read_only=True)
     slug = serializers.SlugField(source='product.slug', read_only=True)
-    images = ProductImageSerializer(many=True, read_only=True)
+    images = ProductImageSerializer(source='primary_images', many=True, read_only=True)
     
     class Meta:
         model = ProductVariant
@@ -48,29 +50,60 @@ class CartItemSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(str)
     def get_line_total(self, obj):
-        unit = obj.variant.discounted_price or obj.variant.price or Decimal("0")
-        return str(unit * obj.quantity)
+        return str(obj.line_total)
+
+
+def priced_cart_items(cart):
+    """
+    Every line of a cart with its variant and product in one query,
+    priced in SQL as unit_price and line_total.
+    """
+    unit_price = Coalesce(
+        'variant__discounted_price', 'variant__price', Value(Decimal("0")),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    return list(
+        cart.cart_items
+        .select_related('variant__product')
+        .annotate(
+            unit_price=unit_price,
+            line_total=ExpressionWrapper(
+                unit_price * F('quantity'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        .order_by('id')
+    )
 
 class CartSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(source='cart_items', many=True, read_only=True)
+    items = serializers.SerializerMethodField()
     items_count = serializers.SerializerMethodField()
     subtotal = serializers.SerializerMethodField()
     
     class Meta:
         model = Cart
         fields = ['id', 'items', 'items_count', 'subtotal']
+    
+    def to_representation(self, instance):
+        # Lines are loaded once and every field below is one pass over them.
+        # Guest carts (cart.storage) carry their own priced lines.
+        if getattr(instance, 'is_guest', False):
+            self._lines = instance.lines
+        else:
+            self._lines = priced_cart_items(instance)
+        return super().to_representation(instance)
+    
+    @extend_schema_field(CartItemSerializer(many=True))
+    def get_items(self, obj):
+        return CartItemSerializer(self._lines, many=True, context=self.context).data
         
     @extend_schema_field(int)
     def get_items_count(self, obj):
-        return sum(item.quantity for item in obj.cart_items.all())
+        return sum(item.quantity for item in self._lines)
     
     @extend_schema_field(str)
     def get_subtotal(self, obj):
-        total = Decimal("0")
-        for item in obj.cart_items.select_related("variant"):
-            unit = item.variant.discounted_price or item.variant.price or Decimal("0")
-            total += unit * item.quantity
-        return str(total)
+        return str(sum((item.line_total for item in self._lines), Decimal("0")))
 
 class CartItemCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -86,22 +119,23 @@ class CartItemCreateSerializer(serializers.ModelSerializer):
         cart = self.context['cart']
         variant = validated_data.get('variant')
         
-        # to prevent race conditions
-        with transaction.atomic():
-            variant = ProductVariant.objects.select_for_update().get(pk=variant.pk)
-            if variant.stock <= 0:
-                raise serializers.ValidationError({"detail": "Out of stock."})
-            
-            item, created = CartItem.objects.select_for_update().get_or_create(
-                cart=cart, variant=variant, defaults={'quantity': 1}
-            )
-            if not created:
-                target = min(item.quantity + 1, variant.stock)
-                
-                if target == item.quantity:
-                    return item
-                
-                CartItem.objects.filter(pk=item.pk).update(quantity=target)
-                item.refresh_from_db()
-        return item
+        if not add_to_cart(cart, variant):
+            raise serializers.ValidationError({"detail": "Out of stock."})
+        
+        if getattr(cart, 'is_guest', False):
+            return cart.get_item(variant.pk)
+        return CartItem.objects.get(cart=cart, variant=variant)
+
+
+class CartBatchLineSerializer(serializers.Serializer):
+    variant = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0)
+
+class CartBatchUpdateSerializer(serializers.Serializer):
+    items = CartBatchLineSerializer(many=True, allow_empty=False, max_length=100)
     
+    def validate_items(self, value):
+        variants = [line['variant'] for line in value]
+        if len(variants) != len(set(variants)):
+            raise serializers.ValidationError("Each variant may appear only once.")
+        return value
@@ -0,0 +1,161 @@
+from decimal import Decimal
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from django_redis import get_redis_connection
+from products.models import ProductVariant
+
+DEFAULT_GUEST_CART_TTL = 60 * 60 * 24 * 30  # 30 days, same as the cookie
+
+# Adds `step` to a line, clamped to the stock passed in by the caller.
+# Returns the new quantity (0 means the line was dropped).
+_ADD_SCRIPT = """
+local qty = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+local target = math.min(qty + tonumber(ARGV[2]), tonumber(ARGV[3]))
+if target > 0 then
+    redis.call('HSET', KEYS[1], ARGV[1], target)
+else
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return target
+"""
+
+# Removes one unit; the line goes away at zero. Returns -1 if the line
+# does not exist.
+_DECREMENT_SCRIPT = """
+local qty = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if qty <= 0 then
+    return -1
+end
+if qty <= 1 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[1], qty - 1)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return qty - 1
+"""
+
+
+class GuestCartItem:
+    """
+    Cart line of a guest cart. Mirrors the CartItem attributes the cart
+    serializers read; the line id is the variant id.
+    """
+    created_at = None
+    updated_at = None
+
+    def __init__(self, cart, variant, quantity):
+        self.cart = cart
+        self.variant = variant
+        self.variant_id = variant.pk
+        self.id = self.pk = variant.pk
+        self.quantity = quantity
+
+    @property
+    def unit_price(self):
+        return self.variant.discounted_price or self.variant.price or Decimal("0")
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+    def delete(self):
+        self.cart.remove(self.variant_id)
+
+
+class RedisGuestCart:
+    """
+    Guest cart stored in a Redis hash (variant_id -> quantity) with a
+    sliding TTL. Nothing is written to Postgres until the cart is merged
+    into a user cart at login.
+    """
+    is_guest = True
+    id = None
+
+    def __init__(self, guest_id):
+        self.guest_id = guest_id
+        self.key = f"cart:guest:{guest_id}"
+        self.ttl = getattr(settings, "CART_GUEST_TTL", DEFAULT_GUEST_CART_TTL)
+        self.redis = get_redis_connection("default")
+
+    @cached_property
+    def quantities(self):
+        # Every read also slides the expiry, in the same round trip.
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(self.key)
+        pipe.expire(self.key, self.ttl)
+        raw, _ = pipe.execute()
+        return {int(variant_id): int(qty) for variant_id, qty in raw.items()}
+
+    def _set_quantity(self, variant_id, quantity):
+        quantities = self.__dict__.get("quantities")
+        if quantities is not None:
+            if quantity > 0:
+                quantities[variant_id] = quantity
+            else:
+                quantities.pop(variant_id, None)
+        self.__dict__.pop("lines", None)
+
+    def add(self, variant_id, stock, step=1):
+        """Add `step` units of a variant, clamped to `stock`. Returns the new quantity."""
+        quantity = self.redis.eval(_ADD_SCRIPT, 1, self.key, variant_id, step, max(stock, 0), self.ttl)
+        self._set_quantity(variant_id, quantity)
+        return quantity
+
+    def decrement(self, variant_id):
+        """Remove one unit. Returns the new quantity, or None if the line does not exist."""
+        quantity = self.redis.eval(_DECREMENT_SCRIPT, 1, self.key, variant_id, self.ttl)
+        if quantity < 0:
+            return None
+        self._set_quantity(variant_id, quantity)
+        return quantity
+
+    def set_quantities(self, quantities):
+        """Set several lines at once ({variant_id: qty}, 0 removes) in one MULTI/EXEC."""
+        pipe = self.redis.pipeline(transaction=True)
+        for variant_id, quantity in quantities.items():
+            if quantity > 0:
+                pipe.hset(self.key, variant_id, quantity)
+            else:
+                pipe.hdel(self.key, variant_id)
+        pipe.expire(self.key, self.ttl)
+        pipe.execute()
+        for variant_id, quantity in quantities.items():
+            self._set_quantity(variant_id, quantity)
+
+    def remove(self, variant_id):
+        removed = self.redis.hdel(self.key, variant_id)
+        self._set_quantity(variant_id, 0)
+        return bool(removed)
+
+    def clear(self):
+        self.redis.delete(self.key)
+        self.__dict__.pop("quantities", None)
+        self.__dict__.pop("lines", None)
+
+    def get_item(self, variant_id):
+        return next((line for line in self.lines if line.variant_id == variant_id), None)
+
+    @cached_property
+    def lines(self):
+        quantities = self.quantities
+        if not quantities:
+            return []
+        variants = ProductVariant.objects.select_related("product").in_bulk(quantities.keys())
+        return [
+            GuestCartItem(self, variants[variant_id], quantity)
+            for variant_id, quantity in sorted(quantities.items())
+            # variants deleted since they were added are skipped
+            if variant_id in variants
+        ]
+
+
+def get_guest_cart_class():
+    """
+    Storage class for guest carts, from settings.CART_GUEST_STORAGE.
+    None keeps guest carts as Cart rows in the database.
+    """
+    path = getattr(settings, "CART_GUEST_STORAGE", "cart.storage.RedisGuestCart")
+    return import_string(path) if path else None
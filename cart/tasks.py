@@ -0,0 +1,75 @@
+import logging
+import time
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GUEST_CART_MAX_AGE = timedelta(days=30)
+DEFAULT_PURGE_BATCH_SIZE = 1000
+
+# One bounded batch: pick idle guest carts (skipping rows another
+# transaction holds), then delete their items and the carts themselves.
+_PURGE_BATCH_SQL = """
+    WITH doomed AS (
+        SELECT c.id
+        FROM cart_cart AS c
+        WHERE c.user_id IS NULL
+          AND c.updated_at < %(cutoff)s
+          AND NOT EXISTS (
+              SELECT 1 FROM cart_cartitem AS i
+              WHERE i.cart_id = c.id AND i.updated_at >= %(cutoff)s
+          )
+        ORDER BY c.updated_at
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    ),
+    deleted_items AS (
+        DELETE FROM cart_cartitem WHERE cart_id IN (SELECT id FROM doomed)
+        RETURNING 1
+    ),
+    deleted_carts AS (
+        DELETE FROM cart_cart WHERE id IN (SELECT id FROM doomed)
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM deleted_carts),
+        (SELECT COUNT(*) FROM deleted_items)
+"""
+
+
+@shared_task
+def purge_abandoned_guest_carts(max_batches=None):
+    """
+    Delete guest carts (and their items) idle for longer than
+    CART_GUEST_MAX_AGE. Each batch is its own short transaction.
+    """
+    cutoff = timezone.now() - getattr(settings, "CART_GUEST_MAX_AGE", DEFAULT_GUEST_CART_MAX_AGE)
+    batch_size = getattr(settings, "CART_PURGE_BATCH_SIZE", DEFAULT_PURGE_BATCH_SIZE)
+
+    started = time.monotonic()
+    carts = items = batches = 0
+    while max_batches is None or batches < max_batches:
+        with connection.cursor() as cursor:
+            cursor.execute(_PURGE_BATCH_SQL, {"cutoff": cutoff, "batch_size": batch_size})
+            deleted_carts, deleted_items = cursor.fetchone()
+        batches += 1
+        carts += deleted_carts
+        items += deleted_items
+        if deleted_carts < batch_size:
+            break
+
+    stats = {
+        "carts": carts,
+        "items": items,
+        "batches": batches,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    logger.info(
+        "Purged abandoned guest carts: carts=%(carts)s items=%(items)s batches=%(batches)s seconds=%(seconds)s",
+        stats,
+    )
+    return stats
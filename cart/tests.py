@@ -1,3 +1,246 @@
-from django.test import TestCase
+import uuid
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APIClient
+from backend.testing import CatalogTestCase
+from products.services.reservations import (
+    cart_holder, held_quantity, reap_expired_holds, release, reserve,
+)
+from .models import Cart, CartItem
+from .storage import RedisGuestCart
+from .utils import (
+    add_to_cart, decrement_cart_item, increment_cart_item, merge_guest_cart, set_cart_quantities,
+)
 
-# Create your tests here.
+
+class CartTestCase(CatalogTestCase):
+    """The shared catalog with 3 units in stock and a cart for the buyer and for another user."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.variant.stock = 3
+        cls.variant.save()
+        cls.other = cls.make_user('other')
+
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(user=self.buyer, guest_id=None)
+        self.other_cart = Cart.objects.create(user=self.other, guest_id=None)
+
+    def quantity(self, cart=None):
+        return CartItem.objects.filter(cart=cart or self.cart, variant=self.variant).values_list('quantity', flat=True).first()
+
+
+class StockHoldTests(CartTestCase):
+    def test_reserve_is_bounded_by_other_holders(self):
+        self.assertEqual(reserve(self.variant, 'a', 2), 2)
+        self.assertEqual(reserve(self.variant, 'b', 5), 1)
+        self.assertEqual(held_quantity(self.variant.pk), 3)
+
+    def test_reserve_replaces_previous_hold(self):
+        reserve(self.variant, 'a', 3)
+        self.assertEqual(reserve(self.variant, 'a', 1), 1)
+        self.assertEqual(held_quantity(self.variant.pk), 1)
+
+    def test_release_frees_units_for_others(self):
+        reserve(self.variant, 'a', 3)
+        release('a', [self.variant.pk])
+        self.assertEqual(held_quantity(self.variant.pk), 0)
+        self.assertEqual(reserve(self.variant, 'b', 3), 3)
+
+    @override_settings(STOCK_RESERVATION_TTL=-1)
+    def test_expired_holds_are_reaped(self):
+        reserve(self.variant, 'a', 3)
+        self.assertEqual(reap_expired_holds(), 1)
+        self.assertEqual(held_quantity(self.variant.pk), 0)
+
+
+class AddToCartTests(CartTestCase):
+    def test_add_takes_a_hold(self):
+        self.assertEqual(add_to_cart(self.cart, self.variant, step=2), 2)
+        self.assertEqual(self.quantity(), 2)
+        self.assertEqual(held_quantity(self.variant.pk), 2)
+
+    def test_add_is_bounded_by_other_carts(self):
+        add_to_cart(self.other_cart, self.variant, step=2)
+        self.assertEqual(add_to_cart(self.cart, self.variant, step=2), 1)
+        self.assertEqual(self.quantity(), 1)
+
+    def test_add_when_held_elsewhere_never_shrinks_the_line(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        # The line's hold expired and another cart took the units.
+        reserve(self.variant, cart_holder(self.other_cart.pk), 2)
+
+        self.assertEqual(add_to_cart(self.cart, self.variant), 0)
+        self.assertEqual(self.quantity(), 2)
+
+    def test_add_at_stock_is_out_of_stock(self):
+        add_to_cart(self.cart, self.variant, step=3)
+        self.assertEqual(add_to_cart(self.cart, self.variant), 0)
+        self.assertEqual(self.quantity(), 3)
+        self.assertEqual(held_quantity(self.variant.pk), 3)
+
+
+class CartItemStepTests(CartTestCase):
+    def test_increment_and_decrement_follow_the_hold(self):
+        add_to_cart(self.cart, self.variant)
+        item = CartItem.objects.get(cart=self.cart)
+
+        self.assertEqual(increment_cart_item(self.cart, item.pk), 2)
+        self.assertEqual(held_quantity(self.variant.pk), 2)
+        self.assertEqual(decrement_cart_item(self.cart, item.pk), 1)
+        self.assertEqual(held_quantity(self.variant.pk), 1)
+        self.assertEqual(decrement_cart_item(self.cart, item.pk), 0)
+        self.assertFalse(CartItem.objects.filter(pk=item.pk).exists())
+        self.assertEqual(held_quantity(self.variant.pk), 0)
+
+    def test_increment_when_held_elsewhere_never_shrinks_the_line(self):
+        item = CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        reserve(self.variant, cart_holder(self.other_cart.pk), 2)
+
+        self.assertEqual(increment_cart_item(self.cart, item.pk), 0)
+        self.assertEqual(self.quantity(), 2)
+
+    def test_increment_other_cart_line_is_not_found(self):
+        item = CartItem.objects.create(cart=self.other_cart, variant=self.variant, quantity=1)
+        self.assertIsNone(increment_cart_item(self.cart, item.pk))
+        self.assertEqual(self.quantity(self.other_cart), 1)
+
+
+class SetCartQuantitiesTests(CartTestCase):
+    def take_all_stock_elsewhere(self, quantity=3):
+        # Our hold expired and another cart took the units.
+        reserve(self.variant, cart_holder(self.other_cart.pk), quantity)
+
+    def test_sets_quantities_and_holds(self):
+        set_cart_quantities(self.cart, {self.variant.pk: 2})
+        self.assertEqual(self.quantity(), 2)
+        self.assertEqual(held_quantity(self.variant.pk), 2)
+
+    def test_raise_under_contention_never_shrinks_the_line(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        self.take_all_stock_elsewhere()
+        set_cart_quantities(self.cart, {self.variant.pk: 3})
+        self.assertEqual(self.quantity(), 2)
+
+    def test_raise_under_contention_takes_what_is_left(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=1)
+        self.take_all_stock_elsewhere(1)
+        set_cart_quantities(self.cart, {self.variant.pk: 3})
+        self.assertEqual(self.quantity(), 2)
+
+    def test_lower_under_contention_keeps_the_requested_quantity(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=3)
+        self.take_all_stock_elsewhere()
+        set_cart_quantities(self.cart, {self.variant.pk: 1})
+        self.assertEqual(self.quantity(), 1)
+
+    def test_nothing_available_adds_no_line(self):
+        self.take_all_stock_elsewhere()
+        set_cart_quantities(self.cart, {self.variant.pk: 2})
+        self.assertIsNone(self.quantity())
+
+    def test_zero_removes_the_line_and_its_hold(self):
+        add_to_cart(self.cart, self.variant, step=2)
+        set_cart_quantities(self.cart, {self.variant.pk: 0})
+        self.assertIsNone(self.quantity())
+        self.assertEqual(held_quantity(self.variant.pk), 0)
+
+
+class MergeGuestCartTests(CartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.guest_id = uuid.uuid4()
+
+    def merge(self):
+        request = RequestFactory().get('/')
+        request.COOKIES['guest_id'] = str(self.guest_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            merge_guest_cart(request, self.buyer, cookie_name='guest_id')
+
+    def assert_held_by_user_cart(self, quantity):
+        self.assertEqual(self.quantity(), quantity)
+        self.assertEqual(held_quantity(self.variant.pk), quantity)
+        # Nothing is left under the guest holder once the user's hold goes.
+        release(cart_holder(self.cart.pk), [self.variant.pk])
+        self.assertEqual(held_quantity(self.variant.pk), 0)
+
+    def test_stored_guest_holds_move_to_the_user_cart(self):
+        add_to_cart(RedisGuestCart(self.guest_id), self.variant, step=2)
+        self.merge()
+        self.assert_held_by_user_cart(2)
+
+    @override_settings(CART_GUEST_STORAGE=None)
+    def test_guest_cart_row_holds_move_to_the_user_cart(self):
+        guest_cart = Cart.objects.create(guest_id=self.guest_id)
+        add_to_cart(guest_cart, self.variant, step=2)
+        self.merge()
+        self.assertFalse(Cart.objects.filter(pk=guest_cart.pk).exists())
+        self.assert_held_by_user_cart(2)
+
+    def test_merge_adds_to_the_user_line_within_stock(self):
+        add_to_cart(self.cart, self.variant)
+        add_to_cart(RedisGuestCart(self.guest_id), self.variant, step=2)
+        self.merge()
+        self.assert_held_by_user_cart(3)
+
+
+class CartBatchEndpointTests(CartTestCase):
+    client_class = APIClient
+    url = '/api/v1/cart/items/'
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.buyer)
+
+    def patch(self, body):
+        return self.client.patch(self.url, body, format='json', HTTP_HOST='localhost')
+
+    def test_rejects_invalid_bodies(self):
+        bodies = [
+            {},
+            {'items': []},
+            {'items': [{'variant': self.variant.pk, 'quantity': 'two'}]},
+            {'items': [{'variant': self.variant.pk, 'quantity': -1}]},
+            {'items': [{'variant': 0, 'quantity': 1}]},
+            {'items': [{'variant': self.variant.pk, 'quantity': 1}, {'variant': self.variant.pk, 'quantity': 2}]},
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(self.patch(body).status_code, 400)
+        self.assertIsNone(self.quantity())
+
+    def test_returns_the_cart(self):
+        response = self.patch({'items': [{'variant': self.variant.pk, 'quantity': 2}]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'id', 'items', 'items_count', 'subtotal'})
+        self.assertEqual(response.data['id'], self.cart.pk)
+        self.assertEqual(response.data['items_count'], 2)
+        self.assertEqual(str(response.data['subtotal']), '200.00')
+        [line] = response.data['items']
+        self.assertEqual(set(line), {'id', 'variant', 'quantity', 'line_total', 'created_at', 'updated_at'})
+        self.assertEqual(line['quantity'], 2)
+        self.assertEqual(line['line_total'], '200.00')
+        self.assertEqual(line['variant']['id'], self.variant.pk)
+        self.assertEqual(line['variant']['slug'], self.product.slug)
+
+    def test_ignores_unknown_variants_and_clamps_to_stock(self):
+        response = self.patch({'items': [
+            {'variant': self.variant.pk, 'quantity': 10},
+            {'variant': self.variant.pk + 1000, 'quantity': 1},
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([line['variant']['id'] for line in response.data['items']], [self.variant.pk])
+        self.assertEqual(self.quantity(), 3)
+        self.assertEqual(held_quantity(self.variant.pk), 3)
+
+    def test_zero_deletes_the_line(self):
+        add_to_cart(self.cart, self.variant, step=2)
+        response = self.patch({'items': [{'variant': self.variant.pk, 'quantity': 0}]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'], [])
+        self.assertEqual(response.data['items_count'], 0)
+        self.assertIsNone(self.quantity())
@@ -3,6 +3,7 @@ from django.urls import path
 from .views import (
     CartDetailAPIView,
     CartAddItemAPIView,
+    CartItemsBatchAPIView,
     CartIncrementItemAPIView,
     CartDecrementItemAPIView,
     CartRemoveItemAPIView,
@@ -11,6 +12,7 @@ from .views import (
 urlpatterns = [
     path("", CartDetailAPIView.as_view()),                   
     path("add/", CartAddItemAPIView.as_view()),   
+    path("items/", CartItemsBatchAPIView.as_view()),
     path("<int:pk>/increment/", CartIncrementItemAPIView.as_view()),
     path("<int:pk>/decrement/", CartDecrementItemAPIView.as_view()),
     path("<int:pk>/delete/", CartRemoveItemAPIView.as_view()), 
@@ -1,5 +1,17 @@
 import uuid
+from django.db import connection, transaction
+from backend.db import values_table
+from products.models import ProductVariant
+from products.services.reservations import holder_for, release, reserve, reserve_many
 from .models import Cart, CartItem
+from .storage import get_guest_cart_class
+
+
+def _valid_guest_id(value):
+    try:
+        return str(uuid.UUID(value)) if value else None
+    except ValueError:
+        return None
 
 
 def get_or_create_cart(request, cookie_name=None):
@@ -7,12 +19,21 @@ def get_or_create_cart(request, cookie_name=None):
     Returns (cart, guest_id_to_set_or_None).
     - Auth user: one cart per user.
     - Guest: cart by guest_id cookie; create + return new guest_id if missing.
+      With a guest storage configured (cart.storage) no database row is
+      created; the cart lives in that storage until login.
     """
     if request.user.is_authenticated:
         cart, _ = Cart.objects.get_or_create(user=request.user)
         return cart, None
 
-    guest_id = request.COOKIES.get(cookie_name)
+    guest_id = _valid_guest_id(request.COOKIES.get(cookie_name))
+    guest_cart_class = get_guest_cart_class()
+    if guest_cart_class is not None:
+        if guest_id:
+            return guest_cart_class(guest_id), None
+        new_guest_id = str(uuid.uuid4())
+        return guest_cart_class(new_guest_id), new_guest_id
+
     if guest_id:
         cart, _ = Cart.objects.get_or_create(guest_id=guest_id)
         return cart, None
@@ -25,38 +46,255 @@ def get_or_create_cart(request, cookie_name=None):
 
 
 
+def add_to_cart(cart, variant, step=1):
+    """
+    Add `step` units of `variant` and return the line's new quantity
+    (0 means nothing could be added). The quantity is bounded by a
+    time-boxed stock hold instead of a row lock on the variant, so
+    concurrent carts adding the same SKU never queue on one row.
+    """
+    if getattr(cart, 'is_guest', False):
+        current = cart.quantities.get(variant.pk, 0)
+    else:
+        current = CartItem.objects.filter(cart=cart, variant=variant).values_list('quantity', flat=True).first() or 0
+
+    holder = holder_for(cart)
+    granted = reserve(variant, holder, current + step)
+    if granted <= current:
+        # Nothing left to add. The line keeps its quantity; put the hold
+        # back to cover it if other carts have not taken the units since.
+        if granted < current:
+            reserve(variant, holder, current)
+        return 0
+
+    if getattr(cart, 'is_guest', False):
+        cart.set_quantities({variant.pk: granted})
+    else:
+        CartItem.objects.update_or_create(cart=cart, variant=variant, defaults={'quantity': granted})
+    return granted
+
+
+# One step up, bounded by stock; no row comes back when the line does not
+# exist in this cart or is already at stock. `previous` is the same row
+# before the update, for its old quantity.
+_INCREMENT_CART_ITEM_SQL = """
+    UPDATE cart_cartitem AS c
+    SET quantity = LEAST(c.quantity + %(step)s, v.stock), updated_at = NOW()
+    FROM products_productvariant AS v, cart_cartitem AS previous
+    WHERE c.id = %(item_id)s AND c.cart_id = %(cart_id)s
+      AND v.id = c.variant_id AND c.quantity < v.stock AND previous.id = c.id
+    RETURNING previous.quantity, c.quantity, c.variant_id, v.stock
+"""
+
+# One step down; the last unit deletes the line. Returns (variant_id,
+# new quantity, stock) for whichever branch matched.
+_DECREMENT_CART_ITEM_SQL = """
+    WITH deleted AS (
+        DELETE FROM cart_cartitem
+        WHERE id = %(item_id)s AND cart_id = %(cart_id)s AND quantity <= 1
+        RETURNING variant_id, 0 AS quantity
+    ),
+    updated AS (
+        UPDATE cart_cartitem SET quantity = quantity - 1, updated_at = NOW()
+        WHERE id = %(item_id)s AND cart_id = %(cart_id)s AND quantity > 1
+        RETURNING variant_id, quantity
+    )
+    SELECT x.variant_id, x.quantity, v.stock
+    FROM (SELECT * FROM deleted UNION ALL SELECT * FROM updated) AS x
+    JOIN products_productvariant AS v ON v.id = x.variant_id
+"""
+
+
+def increment_cart_item(cart, item_id, step=1):
+    """
+    Add `step` units to a line of a database cart in one conditional
+    UPDATE, then take the matching stock hold. Same return values as
+    add_to_cart, plus None when the line is not in this cart.
+    """
+    params = {'item_id': item_id, 'cart_id': cart.pk, 'step': step}
+    with connection.cursor() as cursor:
+        cursor.execute(_INCREMENT_CART_ITEM_SQL, params)
+        row = cursor.fetchone()
+    if row is None:
+        # Missing, or already at stock (then the quantity is unchanged).
+        return CartItem.objects.filter(pk=item_id, cart=cart).values_list('quantity', flat=True).first()
+
+    previous, quantity, variant_id, stock = row
+    variant, holder = ProductVariant(pk=variant_id, stock=stock), holder_for(cart)
+    granted = reserve(variant, holder, quantity)
+    if granted >= quantity:
+        return granted
+
+    # Other carts hold the rest; give back what the hold did not cover,
+    # but never go below the quantity the line had before.
+    CartItem.objects.filter(pk=item_id).update(quantity=max(granted, previous))
+    if granted <= previous:
+        if granted < previous:
+            reserve(variant, holder, previous)
+        return 0
+    return granted
+
+
+def decrement_cart_item(cart, item_id):
+    """
+    Remove one unit from a line of a database cart (the last unit removes
+    the line) in one statement, and shrink the stock hold to match.
+    Returns the new quantity, or None when the line is not in this cart.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(_DECREMENT_CART_ITEM_SQL, {'item_id': item_id, 'cart_id': cart.pk})
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    variant_id, quantity, stock = row
+    reserve(ProductVariant(pk=variant_id, stock=stock), holder_for(cart), quantity)
+    return quantity
+
+
+# Adds guest quantities onto the user's cart, clamped to stock, in one
+# statement. {source} yields rows x (variant_id, quantity).
+_MERGE_CART_ITEMS_SQL = """
+    INSERT INTO cart_cartitem (cart_id, variant_id, quantity, created_at, updated_at)
+    SELECT %s, v.id, LEAST(x.quantity, v.stock), NOW(), NOW()
+    FROM {source}
+    JOIN products_productvariant AS v ON v.id = x.variant_id
+    WHERE x.quantity > 0 AND v.stock > 0
+    ON CONFLICT (cart_id, variant_id) DO UPDATE SET
+        quantity = LEAST(
+            cart_cartitem.quantity + EXCLUDED.quantity,
+            (SELECT stock FROM products_productvariant WHERE id = EXCLUDED.variant_id)
+        ),
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def _merge_lines(user_cart, source, params):
+    with connection.cursor() as cursor:
+        cursor.execute(_MERGE_CART_ITEMS_SQL.format(source=source), [user_cart.pk, *params])
+
+
 def merge_guest_cart(request, user, cookie_name=None):
-    guest_id = request.COOKIES.get(cookie_name)
+    """
+    Fold the guest cart into the user's cart at login. Quantities are
+    added and clamped to stock set-wise, so the cost does not grow with
+    the number of guest lines. The guest's stock holds move to the
+    user's cart once the merge commits.
+    """
+    guest_id = _valid_guest_id(request.COOKIES.get(cookie_name))
     if not guest_id:
         return
     
-    try:
-        guest_cart = Cart.objects.get(guest_id=guest_id)
-    except Cart.DoesNotExist:
+    # Carts held in guest storage are materialized here, at login.
+    guest_cart_class = get_guest_cart_class()
+    stored = guest_cart_class(guest_id) if guest_cart_class is not None else None
+    quantities = stored.quantities if stored is not None else {}
+    # Guest carts created before the storage switch are still rows.
+    guest_cart = Cart.objects.filter(guest_id=guest_id, user__isnull=True).first()
+    if not quantities and guest_cart is None:
         return
 
-    user_cart, _ = Cart.objects.get_or_create(user=user)
+    with transaction.atomic():
+        user_cart, _ = Cart.objects.get_or_create(user=user)
+        merged = set(quantities)
+
+        if quantities:
+            source, params = values_table(
+                'x', [('variant_id', 'integer'), ('quantity', 'integer')], sorted(quantities.items())
+            )
+            _merge_lines(user_cart, source, params)
+            transaction.on_commit(stored.clear)
+            transaction.on_commit(lambda: release(holder_for(stored), list(quantities)))
+
+        if guest_cart is not None:
+            guest_holder = holder_for(guest_cart)
+            guest_variants = list(CartItem.objects.filter(cart=guest_cart).values_list('variant_id', flat=True))
+            merged.update(guest_variants)
+            _merge_lines(
+                user_cart,
+                "(SELECT variant_id, quantity FROM cart_cartitem WHERE cart_id = %s) AS x",
+                [guest_cart.pk],
+            )
+            CartItem.objects.filter(cart=guest_cart).delete()
+            guest_cart.delete()
+            transaction.on_commit(lambda: release(guest_holder, guest_variants))
+
+        # Hold the merged lines for the user's cart, after the guest
+        # holds above are released so they do not count against it.
+        # Lines keep their quantity even if other carts took units since.
+        wanted = [
+            (line.variant, line.quantity)
+            for line in CartItem.objects.filter(cart=user_cart, variant_id__in=merged)
+            .select_related('variant').only('quantity', 'variant__stock').order_by('variant_id')
+        ]
+        if wanted:
+            transaction.on_commit(lambda: reserve_many(holder_for(user_cart), wanted))
     
-    for guest_item in guest_cart.cart_items.select_related("variant"):
-        stock = guest_item.variant.stock or 0
-        if stock <= 0:
-            continue
-        
-        item, created = CartItem.objects.get_or_create(
-            cart=user_cart,
-            variant=guest_item.variant,
-            defaults={"quantity": guest_item.quantity},
+        if user_cart.guest_id:
+            user_cart.guest_id = None
+            user_cart.save(update_fields=["guest_id"])
+
+
+_UPSERT_CART_ITEMS_SQL = """
+    INSERT INTO cart_cartitem (cart_id, variant_id, quantity, created_at, updated_at)
+    SELECT %s, v.id, LEAST(x.quantity, v.stock), NOW(), NOW()
+    FROM {values}
+    JOIN products_productvariant AS v ON v.id = x.variant_id
+    WHERE x.quantity > 0 AND v.stock > 0
+    ON CONFLICT (cart_id, variant_id) DO UPDATE SET
+        quantity = EXCLUDED.quantity,
+        updated_at = EXCLUDED.updated_at
+    WHERE cart_cartitem.quantity <> EXCLUDED.quantity
+"""
+
+
+def set_cart_quantities(cart, quantities):
+    """
+    Set absolute quantities for several lines at once ({variant_id: qty}).
+    Quantities are clamped to stock and to what other carts leave
+    available, but a line never drops below the quantity it already had
+    unless asked to; only 0 removes it. Unknown variant ids are ignored.
+    """
+    # Holds are taken in primary-key order; they, rather than row locks,
+    # bound the quantities written below.
+    variants = ProductVariant.objects.filter(pk__in=quantities).only('pk', 'stock').order_by('pk')
+    wanted = [(variant, quantities[variant.pk]) for variant in variants]
+    if not wanted:
+        return
+    if getattr(cart, 'is_guest', False):
+        current = cart.quantities
+    else:
+        current = dict(
+            CartItem.objects.filter(cart=cart, variant_id__in=[variant.pk for variant, _ in wanted])
+            .values_list('variant_id', 'quantity')
         )
-        if not created:
-            new_qty = item.quantity + guest_item.quantity
-            if new_qty > stock:
-                new_qty = stock
-            if new_qty != item.quantity:
-                item.quantity = new_qty
-                item.save(update_fields=["quantity"])
-            
-    guest_cart.delete()
-    
-    if user_cart.guest_id:
-        user_cart.guest_id = None
-        user_cart.save(update_fields=["guest_id"])
+
+    holder = holder_for(cart)
+    granted = reserve_many(holder, wanted)
+    rows, restore = [], []
+    for (variant, quantity), held in zip(wanted, granted):
+        kept = min(current.get(variant.pk, 0), quantity)
+        if held < kept:
+            # Other carts took the units: keep what the line had and put
+            # its hold back where possible, as add_to_cart does.
+            restore.append((variant, kept))
+            held = kept
+        if held > 0 or quantity <= 0:
+            rows.append((variant.pk, held))
+    if restore:
+        reserve_many(holder, restore)
+    if not rows:
+        return
+
+    if getattr(cart, 'is_guest', False):
+        cart.set_quantities(dict(rows))
+        return
+
+    with transaction.atomic():
+        values, params = values_table('x', [('variant_id', 'integer'), ('quantity', 'integer')], rows)
+        with connection.cursor() as cursor:
+            cursor.execute(_UPSERT_CART_ITEMS_SQL.format(values=values), [cart.pk, *params])
+
+        removed = [variant_id for variant_id, quantity in rows if quantity <= 0]
+        if removed:
+            CartItem.objects.filter(cart=cart, variant_id__in=removed).delete()
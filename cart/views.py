@@ -1,5 +1,4 @@
-from django.db.models import F
-from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.generics import (
@@ -9,12 +8,19 @@ from rest_framework.generics import (
     DestroyAPIView,
 )
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from cart.utils import get_or_create_cart
-from products.models import ProductVariant
+from cart.utils import (
+    add_to_cart, decrement_cart_item, get_or_create_cart,
+    increment_cart_item, set_cart_quantities,
+)
+from products.services.reservations import holder_for, release, reserve
+from products.models import ProductImage, ProductVariant
+from .wishlist import toggle_wishlist
 from .serializers import (
+    CartBatchUpdateSerializer,
     CartItemCreateSerializer,
     CartSerializer,
     WishlistItemSerializer,
@@ -27,19 +33,27 @@ COOKIE_AGE = 60 * 60 * 24 * 30  # 30 days
 
 # -------------------- Wishlist --------------------
 
+def wishlist_items(user):
+    return (
+        WishlistItem.objects
+        .filter(user=user)
+        .select_related('variant', 'variant__product')
+        .prefetch_related(
+            # one image per variant, the primary one when marked
+            Prefetch(
+                'variant__images',
+                queryset=ProductImage.objects.order_by('-is_primary', 'id')[:1],
+                to_attr='primary_images',
+            ),
+        )
+    )
+
 class WishlistListAPIView(ListAPIView):
     serializer_class = WishlistItemSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return (
-            WishlistItem.objects
-            .filter(user=self.request.user)
-            .select_related('variant', 'variant__product')
-            .prefetch_related(
-                'variant__images',
-            )
-        )
+        return wishlist_items(self.request.user)
 
 class WishlistToggleAPIView(APIView):
     serializer_class = WishlistCreateSerializer
@@ -49,16 +63,21 @@ class WishlistToggleAPIView(APIView):
         variant = request.data.get('variant')
         if not variant:
             return Response({"detail": "variant field is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            variant = int(variant)
+        except (TypeError, ValueError):
+            return Response({"detail": "variant must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
         
-        variant = get_object_or_404(ProductVariant.objects.select_related('product'), id=variant)
-        
-        item = WishlistItem.objects.filter(user=request.user, variant=variant).first()
-        if item:
-            item.delete()
+        action, item_id = toggle_wishlist(request.user, variant)
+        if action == 'deleted':
             return Response(status=status.HTTP_204_NO_CONTENT)
         
-        new_item = WishlistItem.objects.create(user=request.user, variant=variant)
-        return Response(WishlistItemSerializer(new_item).data, status=status.HTTP_201_CREATED)
+        # inserted, or a concurrent toggle already added it
+        lookup = {'pk': item_id} if item_id else {'variant_id': variant}
+        item = wishlist_items(request.user).filter(**lookup).first()
+        if item is None:
+            raise NotFound("No ProductVariant matches the given query.")
+        return Response(WishlistItemSerializer(item).data, status=status.HTTP_201_CREATED)
 
 # -------------------- Cart --------------------
 
@@ -90,25 +109,47 @@ class CartAddItemAPIView(GenericAPIView):
                             httponly=True, samesite="Lax")  # add secure=True in prod
         return resp
 
+class CartItemsBatchAPIView(GenericAPIView):
+    """
+    PATCH {"items": [{"variant": 12, "quantity": 3}, ...]}
+    Sets absolute quantities (0 removes the line), clamped to stock,
+    in one transaction, and returns the cart once.
+    """
+    permission_classes = [AllowAny]
+    serializer_class = CartBatchUpdateSerializer
+
+    def patch(self, request, *args, **kwargs):
+        ser = self.get_serializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+
+        cart, new_guest_id = get_or_create_cart(request, cookie_name=COOKIE_NAME)
+        set_cart_quantities(cart, {line['variant']: line['quantity'] for line in ser.validated_data['items']})
+
+        resp = Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        if new_guest_id:
+            resp.set_cookie(COOKIE_NAME, new_guest_id, max_age=COOKIE_AGE,
+                            httponly=True, samesite="Lax")  # add secure=True in prod
+        return resp
+
 class CartIncrementItemAPIView(GenericAPIView):
     permission_classes = [AllowAny]
     serializer_class = CartSerializer
     
     def post(self, request, pk):
         cart, _ = get_or_create_cart(request, cookie_name=COOKIE_NAME)
-        item = get_object_or_404(CartItem.objects.select_related("variant"), pk=pk, cart=cart)
-        
-
-        with transaction.atomic():
-            variant = ProductVariant.objects.select_for_update().get(pk=item.variant_id)
-            item = CartItem.objects.select_for_update().get(pk=item.pk)
-
-            if variant.stock <= 0:
-                return Response({"detail": "Out of stock."}, status=status.HTTP_400_BAD_REQUEST)
-
-            target = min(item.quantity + 1, variant.stock)
-            if target != item.quantity:
-                CartItem.objects.filter(pk=item.pk).update(quantity=target)
+        if getattr(cart, 'is_guest', False):
+            # guest line ids are variant ids
+            if pk not in cart.quantities:
+                raise NotFound("No CartItem matches the given query.")
+            variant = get_object_or_404(ProductVariant.objects.only('stock'), pk=pk)
+            quantity = add_to_cart(cart, variant)
+        else:
+            quantity = increment_cart_item(cart, pk)
+            if quantity is None:
+                raise NotFound("No CartItem matches the given query.")
+
+        if not quantity:
+            return Response({"detail": "Out of stock."}, status=status.HTTP_400_BAD_REQUEST)
             
         return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
 
@@ -119,13 +160,16 @@ class CartDecrementItemAPIView(GenericAPIView):
     
     def post(self, request, pk):
         cart, _ = get_or_create_cart(request, cookie_name=COOKIE_NAME)
-        item = get_object_or_404(CartItem.objects.select_related("variant"), pk=pk, cart=cart)
-        
-        with transaction.atomic():
-            if item.quantity <= 1:
-                item.delete()
-            else:
-                CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') - 1)
+        if getattr(cart, 'is_guest', False):
+            quantity = cart.decrement(pk)
+            if quantity is None:
+                raise NotFound("No CartItem matches the given query.")
+            # shrink the stock hold to match
+            variant = ProductVariant.objects.only('stock').filter(pk=pk).first()
+            if variant is not None:
+                reserve(variant, holder_for(cart), quantity)
+        elif decrement_cart_item(cart, pk) is None:
+            raise NotFound("No CartItem matches the given query.")
                 
         return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
 
@@ -134,5 +178,15 @@ class CartRemoveItemAPIView(DestroyAPIView):
     lookup_url_kwarg = "pk"
 
     def get_object(self):
-        cart, _ = get_or_create_cart(self.request, cookie_name=COOKIE_NAME)
+        self.cart = cart = get_or_create_cart(self.request, cookie_name=COOKIE_NAME)[0]
+        if getattr(cart, 'is_guest', False):
+            # GuestCartItem.delete() drops the line from guest storage
+            item = cart.get_item(self.kwargs["pk"])
+            if item is None:
+                raise NotFound("No CartItem matches the given query.")
+            return item
         return get_object_or_404(CartItem, pk=self.kwargs["pk"], cart=cart)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        release(holder_for(self.cart), [instance.variant_id])
@@ -0,0 +1,94 @@
+from django.db import connection, transaction
+from django_redis import get_redis_connection
+from backend.cache import invalidate
+from .models import WishlistItem
+
+# Per-user membership set in Redis (variant ids), built from the table on
+# first read and kept in step by toggle_wishlist. The sentinel member lets
+# an empty wishlist be cached too.
+MEMBERSHIP_TTL = 60 * 60 * 24
+_SENTINEL = "0"
+
+# Delete the row if it exists, otherwise insert it: one statement, with
+# unique_wishlist_item settling concurrent toggles.
+_TOGGLE_SQL = """
+    WITH deleted AS (
+        DELETE FROM cart_wishlistitem
+        WHERE user_id = %(user_id)s AND variant_id = %(variant_id)s
+        RETURNING id
+    ),
+    inserted AS (
+        INSERT INTO cart_wishlistitem (user_id, variant_id, created_at, updated_at)
+        SELECT %(user_id)s, v.id, NOW(), NOW()
+        FROM products_productvariant AS v
+        WHERE v.id = %(variant_id)s AND NOT EXISTS (SELECT 1 FROM deleted)
+        ON CONFLICT ON CONSTRAINT unique_wishlist_item DO NOTHING
+        RETURNING id
+    )
+    SELECT 'deleted', id FROM deleted
+    UNION ALL
+    SELECT 'inserted', id FROM inserted
+"""
+
+
+def wishlist_namespace(user_id):
+    # Cache generation for anything rendered with this user's hearts.
+    return f"wishlist:{user_id}"
+
+
+def _key(user_id):
+    return f"wishlist:members:{user_id}"
+
+
+def toggle_wishlist(user, variant_id):
+    """
+    Add the variant to the user's wishlist, or remove it if present.
+    Returns ('inserted' | 'deleted', item_id), or (None, None) when the
+    variant does not exist or a concurrent toggle won.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(_TOGGLE_SQL, {"user_id": user.pk, "variant_id": variant_id})
+        row = cursor.fetchone()
+    if row is None:
+        return None, None
+
+    action, item_id = row
+
+    def sync():
+        redis = get_redis_connection("default")
+        key = _key(user.pk)
+        # Only patch a set that is already built; otherwise the next
+        # read rebuilds it from the table.
+        if redis.exists(key):
+            if action == "inserted":
+                redis.sadd(key, variant_id)
+            else:
+                redis.srem(key, variant_id)
+    transaction.on_commit(sync)
+    invalidate(wishlist_namespace(user.pk))
+    return action, item_id
+
+
+def _ensure_members(redis, user):
+    key = _key(user.pk)
+    if redis.exists(key):
+        return
+    members = [str(pk) for pk in WishlistItem.objects.filter(user=user).values_list("variant_id", flat=True)]
+    pipe = redis.pipeline()
+    pipe.sadd(key, _SENTINEL, *members)
+    pipe.expire(key, MEMBERSHIP_TTL)
+    pipe.execute()
+
+
+def wishlisted_variants(user, variant_ids):
+    """Subset of variant_ids in the user's wishlist, in one SISMEMBER pipeline."""
+    variant_ids = [pk for pk in variant_ids if pk is not None]
+    if not variant_ids or not user.is_authenticated:
+        return set()
+
+    redis = get_redis_connection("default")
+    _ensure_members(redis, user)
+    pipe = redis.pipeline(transaction=False)
+    for variant_id in variant_ids:
+        pipe.sismember(_key(user.pk), variant_id)
+    return {variant_id for variant_id, member in zip(variant_ids, pipe.execute()) if member}
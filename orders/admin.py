@@ -1,6 +1,6 @@
 from django.contrib import admin
 from unfold.admin import ModelAdmin
-from .models import ShippingAddress, Coupon, Order, OrderItem, Payment, Invoice
+from .models import ShippingAddress, Coupon, Order, OrderItem, Payment, Invoice, VendorOrder
 
 
 @admin.register(ShippingAddress)
@@ -26,6 +26,17 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ('total_price',)
 
 
+class VendorOrderInline(admin.TabularInline):
+    model = VendorOrder
+    extra = 0
+    readonly_fields = ('vendor', 'subtotal', 'discount_amount', 'tax', 'total', 'created_at')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        # Written by checkout only
+        return False
+
+
 class PaymentInline(admin.StackedInline):
     model = Payment
     extra = 0
@@ -45,8 +56,8 @@ class OrderAdmin(ModelAdmin):
     list_display = ('id', 'user', 'status', 'total_price', 'discount_amount', 'total_tax', 'created_at')
     search_fields = ('user__email', 'user__username', 'id')
     list_filter = ('status', 'created_at')
-    readonly_fields = ('created_at',)
-    inlines = [OrderItemInline, PaymentInline, InvoiceInline]
+    readonly_fields = ('subtotal', 'grand_total', 'created_at')
+    inlines = [OrderItemInline, VendorOrderInline, PaymentInline, InvoiceInline]
 
 
 @admin.register(OrderItem)
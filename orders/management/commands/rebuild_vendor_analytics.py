@@ -0,0 +1,18 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from orders.services.analytics import refresh_vendor_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuild the vendor sales rollups used by the vendor analytics endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=int, help="Only rebuild rollups for this vendor id.")
+        parser.add_argument('--since', type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--until', type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        vendor_ids = [options['vendor']] if options['vendor'] else None
+        until = options['until'] + timedelta(days=1) if options['until'] else None
+        count = refresh_vendor_sales(vendor_ids, options['since'], until)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} vendor daily sales rows."))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:59
+
+from django.db import migrations, models
+
+
+# Continue every existing numbering scope (INV-000041 -> INV at 41) so
+# new invoices never collide with the ones issued by counting rows.
+SEED_INVOICE_SEQUENCES = r"""
+    INSERT INTO orders_invoicesequence (scope, last_value)
+    SELECT m[1], MAX(m[2]::bigint)
+    FROM (
+        SELECT regexp_match(invoice_number, '^(.+)-(\d+)$') AS m
+        FROM orders_invoice
+    ) AS x
+    WHERE m IS NOT NULL
+    GROUP BY m[1]
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderitem_vendor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('scope', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(SEED_INVOICE_SEQUENCES, migrations.RunSQL.noop),
+    ]
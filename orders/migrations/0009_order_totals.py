@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:00
+
+from django.db import migrations, models
+
+
+BACKFILL_ORDER_TOTALS = """
+    UPDATE orders_order AS o
+    SET subtotal = x.subtotal,
+        grand_total = x.subtotal - o.discount_amount + o.total_tax
+    FROM (
+        SELECT o2.id, COALESCE(SUM(i.unit_price * i.quantity), 0) AS subtotal
+        FROM orders_order AS o2
+        LEFT JOIN orders_orderitem AS i ON i.order_id = o2.id
+        GROUP BY o2.id
+    ) AS x
+    WHERE x.id = o.id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_invoicesequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='grand_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunSQL(BACKFILL_ORDER_TOTALS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Existing orders get their splits from their items; discount and tax
+# are shared pro rata, as create_order does for new orders.
+BACKFILL_VENDOR_ORDERS = """
+    INSERT INTO orders_vendororder (order_id, vendor_id, subtotal, discount_amount, tax, total, created_at)
+    SELECT
+        x.order_id, x.vendor_id, x.subtotal, x.discount_amount, x.tax,
+        x.subtotal - x.discount_amount + x.tax, x.created_at
+    FROM (
+        SELECT
+            i.order_id,
+            i.vendor_id,
+            SUM(i.unit_price * i.quantity) AS subtotal,
+            ROUND(COALESCE(o.discount_amount * SUM(i.unit_price * i.quantity) / NULLIF(o.subtotal, 0), 0), 2) AS discount_amount,
+            ROUND(COALESCE(o.total_tax * SUM(i.unit_price * i.quantity) / NULLIF(o.subtotal, 0), 0), 2) AS tax,
+            o.created_at
+        FROM orders_orderitem AS i
+        JOIN orders_order AS o ON o.id = i.order_id
+        GROUP BY i.order_id, i.vendor_id, o.discount_amount, o.total_tax, o.subtotal, o.created_at
+    ) AS x
+    ON CONFLICT ON CONSTRAINT unique_vendor_order DO NOTHING
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_orders', to='orders.order')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor', 'created_at'], name='orders_vend_vendor__85731c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'vendor'), name='unique_vendor_order')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_VENDOR_ORDERS, migrations.RunSQL.noop),
+    ]
@@ -6,7 +6,7 @@ from django_countries.fields import CountryField
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from products.models import ProductVariant
+from products.models import Product, ProductVariant
 
 class ShippingAddress(models.Model):
     user = models.ForeignKey(
@@ -163,22 +163,16 @@ class Order(models.Model):
         choices=STATUS_CHOICES,
         default='pending'
     )
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    grand_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     coupon_code = models.CharField(max_length=50, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Order #{self.id} - {self.user}"
-    
-    @property
-    def subtotal(self):
-        return sum(item.unit_price * item.quantity for item in self.items.all())
-
-    @property
-    def grand_total(self):
-        return self.subtotal - self.discount_amount + self.total_tax
 
 class OrderItem(models.Model):
     order = models.ForeignKey(
@@ -207,6 +201,39 @@ class OrderItem(models.Model):
             return Decimal('0.00')
         return self.unit_price * self.quantity
 
+class VendorOrder(models.Model):
+    """
+    One vendor's share of an order, written at checkout: the vendor's
+    items subtotal with its pro rata part of the order discount and tax.
+    Vendor dashboards read these rows instead of regrouping order items.
+    """
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='vendor_orders'
+    )
+    vendor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='vendor_orders'
+    )
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'vendor'], name='unique_vendor_order'),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id} - vendor {self.vendor_id}"
+
 class Payment(models.Model):
     METHOD_CHOICES = [
         ('card', 'Credit/Debit Card'),
@@ -217,6 +244,7 @@ class Payment(models.Model):
         ('paypal', 'PayPal'),
     ]
     STATUS_CHOICES = [
+        ('initiated', 'Initiated'),
         ('pending', 'Pending'),
         ('success', 'Success'),
         ('failed', 'Failed'),
@@ -276,3 +304,77 @@ class Invoice(models.Model):
 
     def __str__(self):
         return f"Invoice {self.invoice_number} for Order #{self.order_id}"
+
+
+class InvoiceSequence(models.Model):
+    """
+    Last invoice number handed out per scope (prefix, plus the year when
+    numbering restarts yearly). Bumped by invoice_service.next_invoice_number.
+    """
+    scope = models.CharField(max_length=50, primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.scope}: {self.last_value}"
+
+
+class VendorDailySales(models.Model):
+    """
+    Per vendor and day rollup of invoiced orders, maintained by
+    services.analytics. Cancelled invoiced orders count as refunds.
+    """
+    vendor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    day = models.DateField()
+    orders_count = models.PositiveIntegerField(default=0)
+    gross_sales = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discounts = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    net_sales = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refunds_count = models.PositiveIntegerField(default=0)
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day'], name='unique_vendor_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} {self.day}: {self.net_sales}"
+
+
+class VendorProductDailySales(models.Model):
+    """Per vendor, day and variant rollup of units and revenue (see VendorDailySales)."""
+    vendor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='product_daily_sales'
+    )
+    day = models.DateField()
+    variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refunded_units = models.PositiveIntegerField(default=0)
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day', 'variant'], name='unique_vendor_product_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} {self.day} variant {self.variant_id}: {self.units_sold}"
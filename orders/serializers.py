@@ -1,11 +1,13 @@
+from datetime import timedelta
 from decimal import Decimal
+from django.utils import timezone
 from rest_framework import serializers
-from cart.models import CartItem
 from products.models import Tax
 from .services.order_service import create_order
-from .models import ShippingAddress, Coupon, Order, OrderItem, Payment, Invoice
+from .services.payments.base import PaymentGatewayError
+from .services.pricing import create_quote
+from .models import ShippingAddress, Coupon, Order, OrderItem, Payment, Invoice, VendorOrder
 from accounts.serializers import CustomUserSerializer
-from .mixins import VendorOrderTotalsMixin
 
 class ShippingAddressSerializer(serializers.ModelSerializer):
     country_name = serializers.CharField(source='country.name', read_only=True)
@@ -75,8 +77,6 @@ class OrderSerializer(serializers.ModelSerializer):
     payment = PaymentSerializer(read_only=True)
     shipping_address = ShippingAddressSerializer(read_only=True)
     user = CustomUserSerializer(read_only=True)
-    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    grand_total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = Order
@@ -88,31 +88,60 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['status', 'subtotal', 'grand_total', 'total_price', 'created_at']
 
+class QuoteLineSerializer(serializers.Serializer):
+    variant_id = serializers.IntegerField()
+    vendor_id = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    line_total = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class QuoteVendorSerializer(serializers.Serializer):
+    vendor_id = serializers.IntegerField()
+    store_name = serializers.CharField(allow_null=True)
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    tax = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class OrderQuoteSerializer(serializers.Serializer):
+    coupon_code = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    quote_id = serializers.CharField(read_only=True)
+    expires_in = serializers.IntegerField(read_only=True)
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    discount_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_tax = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    lines = QuoteLineSerializer(many=True, read_only=True)
+    vendors = QuoteVendorSerializer(many=True, read_only=True)
+
+    def create(self, validated_data):
+        try:
+            return create_quote(self.context['request'].user, validated_data.get('coupon_code'))
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
 class CreateOrderSerializer(serializers.ModelSerializer):
     shipping_address = serializers.PrimaryKeyRelatedField(queryset=ShippingAddress.objects.all())
     coupon_code = serializers.CharField(required=False, allow_blank=True)
     payment_method = serializers.CharField(required=False, allow_blank=True)
+    quote_id = serializers.CharField(required=False, allow_blank=True, write_only=True)
 
     class Meta:
         model = Order
-        fields = ['shipping_address', 'coupon_code', 'payment_method']
-
-    def validate(self, attrs):
-        user = self.context['request'].user
-
-        cart_items = CartItem.objects.filter(cart__user=user)
-        if not cart_items.exists():
-            raise serializers.ValidationError("Your cart is empty.")
-
-        return attrs
+        fields = ['shipping_address', 'coupon_code', 'payment_method', 'quote_id']
 
     def create(self, validated_data):
-        order, payment_data = create_order(
-            user=self.context['request'].user,
-            shipping_address=validated_data['shipping_address'],
-            coupon_code=validated_data.get('coupon_code'),
-            payment_method=validated_data.get('payment_method')
-        )
+        # An empty cart is detected by create_order, which reads the cart anyway.
+        try:
+            order, payment_data = create_order(
+                user=self.context['request'].user,
+                shipping_address=validated_data['shipping_address'],
+                coupon_code=validated_data.get('coupon_code'),
+                payment_method=validated_data.get('payment_method'),
+                quote_id=validated_data.get('quote_id') or None,
+            )
+        except (ValueError, PaymentGatewayError) as exc:
+            raise serializers.ValidationError(str(exc))
 
         self.context['payment_data'] = payment_data
         return order
@@ -165,15 +194,21 @@ class VendorOrderItemSerializer(serializers.ModelSerializer):
             "total_price",
         ]
 
-class VendorOrderSerializer(VendorOrderTotalsMixin, serializers.ModelSerializer):
-    items = serializers.SerializerMethodField()
-    vendor_subtotal = serializers.SerializerMethodField()
-    vendor_discount_amount = serializers.SerializerMethodField()
-    vendor_tax = serializers.SerializerMethodField()
-    vendor_total = serializers.SerializerMethodField()
+class VendorOrderSerializer(serializers.ModelSerializer):
+    # Keeps the order's shape (id is the order id) with the vendor's split.
+    id = serializers.IntegerField(source="order_id", read_only=True)
+    user = serializers.PrimaryKeyRelatedField(source="order.user", read_only=True)
+    shipping_address = serializers.PrimaryKeyRelatedField(source="order.shipping_address", read_only=True)
+    status = serializers.CharField(source="order.status", read_only=True)
+    coupon_code = serializers.CharField(source="order.coupon_code", read_only=True)
+    vendor_subtotal = serializers.DecimalField(source="subtotal", max_digits=10, decimal_places=2, read_only=True)
+    vendor_discount_amount = serializers.DecimalField(source="discount_amount", max_digits=10, decimal_places=2, read_only=True)
+    vendor_tax = serializers.DecimalField(source="tax", max_digits=10, decimal_places=2, read_only=True)
+    vendor_total = serializers.DecimalField(source="total", max_digits=10, decimal_places=2, read_only=True)
+    items = VendorOrderItemSerializer(source="order.vendor_items", many=True, read_only=True)
 
     class Meta:
-        model = Order
+        model = VendorOrder
         fields = [
             "id",
             "user",
@@ -188,23 +223,8 @@ class VendorOrderSerializer(VendorOrderTotalsMixin, serializers.ModelSerializer)
             "items",
         ]
 
-    def get_items(self, obj):
-        return VendorOrderItemSerializer(getattr(obj, "vendor_items", []), many=True).data
-
-    def get_vendor_subtotal(self, obj):
-        return self.calculate_vendor_subtotal(obj)
-
-    def get_vendor_discount_amount(self, obj):
-        return self.calculate_vendor_discount(obj)
-
-    def get_vendor_tax(self, obj):
-        return self.calculate_vendor_tax(obj)
-
-    def get_vendor_total(self, obj):
-        return self.calculate_vendor_total(obj)
-
 # Payment
-class VendorPaymentSerializer(VendorOrderTotalsMixin, serializers.ModelSerializer):
+class VendorPaymentSerializer(serializers.ModelSerializer):
     order = serializers.SerializerMethodField()
     vendor_amount = serializers.SerializerMethodField()
 
@@ -224,13 +244,13 @@ class VendorPaymentSerializer(VendorOrderTotalsMixin, serializers.ModelSerialize
         ]
 
     def get_order(self, obj):
-        return VendorOrderSerializer(obj.order, context=self.context).data
+        return VendorOrderSerializer(obj.order.vendor_split[0], context=self.context).data
     
     def get_vendor_amount(self, obj):
-        return self.calculate_vendor_total(obj.order)
+        return obj.order.vendor_split[0].total
 
 # Invoice
-class VendorInvoiceSerializer(VendorOrderTotalsMixin, serializers.ModelSerializer):
+class VendorInvoiceSerializer(serializers.ModelSerializer):
     order = serializers.SerializerMethodField()
     vendor_subtotal = serializers.SerializerMethodField()
     vendor_discount = serializers.SerializerMethodField()
@@ -254,17 +274,56 @@ class VendorInvoiceSerializer(VendorOrderTotalsMixin, serializers.ModelSerialize
         ]
 
     def get_order(self, obj):
-        return VendorOrderSerializer(obj.order, context=self.context).data
+        return VendorOrderSerializer(obj.order.vendor_split[0], context=self.context).data
 
     def get_vendor_subtotal(self, obj):
-        return self.calculate_vendor_subtotal(obj.order)
+        return obj.order.vendor_split[0].subtotal
 
     def get_vendor_discount(self, obj):
-        return self.calculate_vendor_discount(obj.order)
+        return obj.order.vendor_split[0].discount_amount
 
     def get_vendor_tax(self, obj):
-        return self.calculate_vendor_tax(obj.order)
+        return obj.order.vendor_split[0].tax
 
     def get_vendor_total(self, obj):
-        return self.calculate_vendor_total(obj.order)
+        return obj.order.vendor_split[0].total
+
+# Analytics
+class VendorAnalyticsQuerySerializer(serializers.Serializer):
+    PERIODS = ("day", "week", "month")
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    period = serializers.ChoiceField(choices=PERIODS, default="day")
+    group = serializers.ChoiceField(choices=("sku", "product"), default="sku")
+    ordering = serializers.ChoiceField(choices=("units", "revenue"), default="units")
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate(self, attrs):
+        attrs.setdefault("date_to", timezone.localdate())
+        attrs.setdefault("date_from", attrs["date_to"] - timedelta(days=29))
+        if attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError("date_from must not be after date_to.")
+        return attrs
 
+class VendorSalesTotalsSerializer(serializers.Serializer):
+    orders_count = serializers.IntegerField()
+    gross_sales = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discounts = serializers.DecimalField(max_digits=12, decimal_places=2)
+    tax = serializers.DecimalField(max_digits=12, decimal_places=2)
+    net_sales = serializers.DecimalField(max_digits=12, decimal_places=2)
+    refunds_count = serializers.IntegerField()
+    refunded_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+class VendorSalesBucketSerializer(VendorSalesTotalsSerializer):
+    period = serializers.DateField()
+
+class VendorProductSalesSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    product_name = serializers.CharField()
+    variant_id = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False)
+    units_sold = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    refunded_units = serializers.IntegerField()
+    refunded_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
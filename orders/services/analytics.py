@@ -0,0 +1,123 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from ..models import Order, VendorOrder
+
+# Vendor sales rollups (VendorDailySales, VendorProductDailySales) are
+# recomputed from VendorOrder / OrderItem for the (vendor, day) cells an
+# order touches, so refreshing is idempotent and a late refund simply
+# rewrites its day. Only invoiced orders count as sales; an invoiced
+# order that was cancelled afterwards counts as a refund. Days are in
+# settings.TIME_ZONE and keyed on the order's creation time.
+
+_DAILY_SALES_SQL = """
+    INSERT INTO orders_vendordailysales (
+        vendor_id, day, orders_count, gross_sales, discounts, tax, net_sales,
+        refunds_count, refunded_amount, updated_at
+    )
+    SELECT
+        vo.vendor_id,
+        (vo.created_at AT TIME ZONE %(tz)s)::date,
+        COUNT(*) FILTER (WHERE o.status <> 'cancelled'),
+        COALESCE(SUM(vo.subtotal) FILTER (WHERE o.status <> 'cancelled'), 0),
+        COALESCE(SUM(vo.discount_amount) FILTER (WHERE o.status <> 'cancelled'), 0),
+        COALESCE(SUM(vo.tax) FILTER (WHERE o.status <> 'cancelled'), 0),
+        COALESCE(SUM(vo.total) FILTER (WHERE o.status <> 'cancelled'), 0),
+        COUNT(*) FILTER (WHERE o.status = 'cancelled'),
+        COALESCE(SUM(vo.total) FILTER (WHERE o.status = 'cancelled'), 0),
+        NOW()
+    FROM orders_vendororder AS vo
+    JOIN orders_order AS o ON o.id = vo.order_id
+    JOIN orders_invoice AS i ON i.order_id = o.id
+    WHERE {condition}
+    GROUP BY 1, 2
+    ON CONFLICT ON CONSTRAINT unique_vendor_daily_sales DO UPDATE SET
+        orders_count = EXCLUDED.orders_count,
+        gross_sales = EXCLUDED.gross_sales,
+        discounts = EXCLUDED.discounts,
+        tax = EXCLUDED.tax,
+        net_sales = EXCLUDED.net_sales,
+        refunds_count = EXCLUDED.refunds_count,
+        refunded_amount = EXCLUDED.refunded_amount,
+        updated_at = EXCLUDED.updated_at
+"""
+
+_PRODUCT_DAILY_SALES_SQL = """
+    INSERT INTO orders_vendorproductdailysales (
+        vendor_id, day, variant_id, product_id, units_sold, revenue,
+        refunded_units, refunded_amount, updated_at
+    )
+    SELECT
+        vo.vendor_id,
+        (vo.created_at AT TIME ZONE %(tz)s)::date,
+        oi.variant_id,
+        v.product_id,
+        COALESCE(SUM(oi.quantity) FILTER (WHERE o.status <> 'cancelled'), 0),
+        COALESCE(SUM(oi.unit_price * oi.quantity) FILTER (WHERE o.status <> 'cancelled'), 0),
+        COALESCE(SUM(oi.quantity) FILTER (WHERE o.status = 'cancelled'), 0),
+        COALESCE(SUM(oi.unit_price * oi.quantity) FILTER (WHERE o.status = 'cancelled'), 0),
+        NOW()
+    FROM orders_vendororder AS vo
+    JOIN orders_order AS o ON o.id = vo.order_id
+    JOIN orders_invoice AS i ON i.order_id = o.id
+    JOIN orders_orderitem AS oi ON oi.order_id = vo.order_id AND oi.vendor_id = vo.vendor_id
+    JOIN products_productvariant AS v ON v.id = oi.variant_id
+    WHERE {condition}
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT ON CONSTRAINT unique_vendor_product_daily_sales DO UPDATE SET
+        product_id = EXCLUDED.product_id,
+        units_sold = EXCLUDED.units_sold,
+        revenue = EXCLUDED.revenue,
+        refunded_units = EXCLUDED.refunded_units,
+        refunded_amount = EXCLUDED.refunded_amount,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def refresh_vendor_sales(vendor_ids=None, start=None, end=None):
+    """
+    Rebuild the rollup rows for the given vendors (None: all) and days
+    from `start` up to, not including, `end` (dates; None: unbounded).
+    Rows in that range that no longer have sales are removed.
+    """
+    conditions, cleanup = [], []
+    params = {'tz': settings.TIME_ZONE, 'vendor_ids': list(vendor_ids or []), 'start': start, 'end': end}
+    if vendor_ids is not None:
+        conditions.append("vo.vendor_id = ANY(%(vendor_ids)s)")
+        cleanup.append("vendor_id = ANY(%(vendor_ids)s)")
+    if start is not None:
+        # Compare on created_at so the (vendor, created_at) index applies.
+        params['start_at'] = _day_start(start)
+        conditions.append("vo.created_at >= %(start_at)s")
+        cleanup.append("day >= %(start)s")
+    if end is not None:
+        params['end_at'] = _day_start(end)
+        conditions.append("vo.created_at < %(end_at)s")
+        cleanup.append("day < %(end)s")
+    condition = " AND ".join(conditions) or "TRUE"
+    cleanup = " AND ".join(cleanup) or "TRUE"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in ("orders_vendordailysales", "orders_vendorproductdailysales"):
+            cursor.execute(f"DELETE FROM {table} WHERE {cleanup}", params)
+        cursor.execute(_DAILY_SALES_SQL.format(condition=condition), params)
+        written = cursor.rowcount
+        cursor.execute(_PRODUCT_DAILY_SALES_SQL.format(condition=condition), params)
+    return written
+
+
+def refresh_order_sales(order_id):
+    """Refresh the rollups of every vendor in an order, for the order's day."""
+    created_at = Order.objects.filter(pk=order_id).values_list('created_at', flat=True).first()
+    if created_at is None:
+        return 0
+    vendor_ids = list(VendorOrder.objects.filter(order_id=order_id).values_list('vendor_id', flat=True))
+    if not vendor_ids:
+        return 0
+    day = timezone.localdate(created_at)
+    return refresh_vendor_sales(vendor_ids, day, day + timedelta(days=1))
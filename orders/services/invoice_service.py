@@ -1,7 +1,38 @@
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
 from orders.models import Invoice
 
+# Bumps (or starts) the scope's counter and returns the new value. The
+# row stays locked until the surrounding transaction ends, so concurrent
+# invoices queue here and a rolled back invoice gives its number back.
+_NEXT_INVOICE_NUMBER_SQL = """
+    INSERT INTO orders_invoicesequence (scope, last_value)
+    VALUES (%s, 1)
+    ON CONFLICT (scope) DO UPDATE
+        SET last_value = orders_invoicesequence.last_value + 1
+    RETURNING last_value
+"""
+
+def next_invoice_number(when=None):
+    """
+    Next invoice number, e.g. INV-000042, or INV-2026-000042 with
+    INVOICE_NUMBER_YEARLY. Call it inside the transaction that creates
+    the invoice.
+    """
+    prefix = getattr(settings, "INVOICE_NUMBER_PREFIX", "INV")
+    padding = getattr(settings, "INVOICE_NUMBER_PADDING", 6)
+    scope = prefix
+    if getattr(settings, "INVOICE_NUMBER_YEARLY", False):
+        scope = f"{prefix}-{(when or timezone.now()).year}"
+
+    with connection.cursor() as cursor:
+        cursor.execute(_NEXT_INVOICE_NUMBER_SQL, [scope])
+        value = cursor.fetchone()[0]
+    return f"{scope}-{value:0{padding}d}"
+
 def create_internal_invoice(order, status="draft"):
-    next_number = f"INV-{Invoice.objects.count() + 1:06d}"
+    next_number = next_invoice_number()
     return Invoice.objects.create(
         order=order,
         invoice_number=next_number,
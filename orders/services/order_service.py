@@ -1,87 +1,157 @@
 from django.db import transaction
-from decimal import Decimal
 from cart.models import CartItem
 from orders.services.invoice_service import create_internal_invoice 
-from products.models import Tax
-from ..models import Coupon, Order, OrderItem, Payment
-import uuid
+from products.services.inventory import decrement_stock
+from products.services.reservations import cart_holder, release
+from ..models import Order, OrderItem, Payment, VendorOrder
+import logging
 from django.utils.timezone import now
 from django.conf import settings
+from .payments.base import PaymentGatewayError
 from .payments.resolver import PaymentGatewayResolver
+from .pricing import cart_lines, discard_quote, get_quote, price_cart
 from ..tasks import send_order_email_async
 
-def create_order(user, shipping_address, coupon_code=None, payment_method='cod'):
-    cart_items = CartItem.objects.filter(cart__user=user)
-    if not cart_items.exists():
-        raise ValueError("Cart is empty")
+logger = logging.getLogger(__name__)
 
-    subtotal = sum(
-        (item.variant.discounted_price or item.variant.price) * item.quantity
-        for item in cart_items
-    )
+def create_order(user, shipping_address, coupon_code=None, payment_method='cod', quote_id=None):
+    payment_method = payment_method or 'cod'
+    gateway = PaymentGatewayResolver.resolve(payment_method)
 
-    discount_amount = Decimal('0')
-    if coupon_code:
-        discount_amount = Coupon.validate_and_get_discount(coupon_code, user, subtotal)
+    lines = cart_lines(user)
+    if not lines:
+        raise ValueError("Cart is empty")
 
-    total_tax = sum(
-        tax.calculate_tax(subtotal)
-        for tax in Tax.objects.filter(is_active=True)
-    )
+    # A quote from POST /orders/quote/ for this exact cart saves pricing it again.
+    priced = quote_id and get_quote(user, quote_id, coupon_code, lines)
+    if not priced:
+        priced = price_cart(user, coupon_code, lines)
 
-    total_price = subtotal - discount_amount + total_tax
+    total_price = priced['total_price']
+    discount_amount = priced['discount_amount']
+    total_tax = priced['total_tax']
 
+    # Phase 1: the order and its items, committed as pending. Nothing
+    # slow runs while this transaction is open.
     with transaction.atomic():
         order = Order.objects.create(
             user=user,
             shipping_address=shipping_address,
+            subtotal=priced['subtotal'],
             total_price=total_price,
             discount_amount=discount_amount,
             total_tax=total_tax,
+            grand_total=total_price,
             coupon_code=coupon_code
         )
 
         OrderItem.objects.bulk_create([
             OrderItem(
                 order=order,
-                variant=item.variant,
-                vendor=item.variant.product.vendor,
-                quantity=item.quantity,
-                unit_price=item.variant.discounted_price or item.variant.price
+                variant_id=line['variant_id'],
+                vendor_id=line['vendor_id'],
+                quantity=line['quantity'],
+                unit_price=line['unit_price']
             )
-            for item in cart_items
+            for line in priced['lines']
         ])
 
-        gateway = PaymentGatewayResolver.resolve(payment_method)
-        payment_data = gateway.send_payment(request=None, user=user, amount=total_price, order=order)
-        
-        Payment.objects.create(
+        VendorOrder.objects.bulk_create([
+            VendorOrder(
+                order=order,
+                vendor_id=vendor['vendor_id'],
+                subtotal=vendor['subtotal'],
+                discount_amount=vendor['discount'],
+                tax=vendor['tax'],
+                total=vendor['total'],
+                created_at=order.created_at
+            )
+            for vendor in priced['vendors']
+        ])
+
+        # The payment exists before the gateway hears of it, so a
+        # callback can always find it.
+        payment = Payment.objects.create(
             order=order,
             method=gateway.method,
             provider=gateway.provider_name,
-            gateway_order_id=payment_data.get("order_id"),
-            transaction_id=payment_data.get("transaction_id"),
             amount=total_price,
-            status=payment_data.get("status", "pending")
+            status='initiated',
         )
-        
-        if payment_method == 'cod':
-            context = {
-                "customer_name": user.first_name or user.username,
-                "customer_email": user.email,
-                "vendor_name": order.items.first().vendor.vendor_profile.store_name if order.items.exists() else "Vendor",
-                "vendor_email": order.items.first().vendor.email if order.items.exists() else settings.DEFAULT_FROM_EMAIL,
-                "order_id": order.id,
-                "current_year": now().year,
-            }
-            send_order_email_async.delay("Order Confirmation", "orders/order_created.html", context)
-            create_internal_invoice(order, status="issued")
-            for item in cart_items:
-                if item.variant.stock < item.quantity:
-                    raise ValueError(f"Not enough stock for {item.variant.sku}")
-                item.variant.stock -= item.quantity
-                item.variant.save(update_fields=['stock'])
-
-        cart_items.delete()
+
+    # The gateway call is outside any transaction and bounded by
+    # settings.PAYMENT_GATEWAY_TIMEOUT. The cart is untouched until it
+    # succeeds, so a failed attempt can simply be retried.
+    try:
+        payment_data = gateway.send_payment(request=None, user=user, amount=total_price, order=order)
+    except Exception as exc:
+        Payment.objects.filter(pk=payment.pk, status='initiated').update(status='failed')
+        cancel_order(order)
+        if not isinstance(exc, gateway.transport_errors):
+            raise
+        logger.exception("Payment gateway %s failed for order #%s", payment_method, order.pk)
+        raise PaymentGatewayError(f"{gateway.provider_name or payment_method} is unavailable, please try again.") from exc
+
+    # Store the gateway's ids right away; a callback that already moved
+    # the payment on keeps its status.
+    Payment.objects.filter(pk=payment.pk).update(
+        gateway_order_id=payment_data.get("order_id"),
+        transaction_id=payment_data.get("transaction_id"),
+    )
+    Payment.objects.filter(pk=payment.pk, status='initiated').update(
+        status=payment_data.get("status", "pending")
+    )
+
+    # Phase 2: consume the cart.
+    try:
+        with transaction.atomic():
+            if payment_method == 'cod':
+                decrement_stock((line['variant_id'], line['quantity']) for line in lines)
+                context = {
+                    "customer_name": user.first_name or user.username,
+                    "customer_email": user.email,
+                    "vendor_name": order.items.first().vendor.vendor_profile.store_name if order.items.exists() else "Vendor",
+                    "vendor_email": order.items.first().vendor.email if order.items.exists() else settings.DEFAULT_FROM_EMAIL,
+                    "order_id": order.id,
+                    "current_year": now().year,
+                }
+                transaction.on_commit(
+                    lambda: send_order_email_async.delay("Order Confirmation", "orders/order_created.html", context)
+                )
+                create_internal_invoice(order, status="issued")
+
+            # The order now owns this stock; drop the cart's holds on it.
+            held = {}
+            for line in lines:
+                held.setdefault(line['cart_id'], []).append(line['variant_id'])
+            transaction.on_commit(lambda: [release(cart_holder(cart_id), ids) for cart_id, ids in held.items()])
+            if quote_id:
+                transaction.on_commit(lambda: discard_quote(quote_id))
+
+            CartItem.objects.filter(pk__in=[line['id'] for line in lines]).delete()
+    except Exception:
+        if cancel_order(order):
+            raise
+        # The gateway already confirmed the payment; the order stands
+        # (the callback takes stock and issues the invoice), only the
+        # cart clean-up is lost.
+        logger.exception("Checkout clean-up failed for paid order #%s", order.pk)
 
     return order, payment_data
+
+
+def cancel_order(order):
+    """
+    Compensate a checkout that failed after its order was committed.
+    An order whose payment already succeeded is left alone; returns
+    whether the order was cancelled.
+    """
+    cancelled = (
+        Order.objects
+        .filter(pk=order.pk, status='pending')
+        .exclude(payment__status='success')
+        .update(status='cancelled')
+    )
+    if cancelled:
+        order.status = 'cancelled'
+    return bool(cancelled)
@@ -1,6 +1,16 @@
 from abc import ABC, abstractmethod
+import requests
+
+
+class PaymentGatewayError(Exception):
+    """The provider could not be reached or rejected the payment request."""
+
 
 class BasePaymentGateway(ABC):
+    # Exceptions meaning the provider could not be reached in time. Only
+    # these are reported to the customer as "unavailable, try again".
+    transport_errors = (requests.Timeout, requests.ConnectionError)
+
     @abstractmethod
     def send_payment(self, request, user, amount, order):
         """Initiate payment and return metadata (redirect url, transaction id, etc.)"""
@@ -12,7 +12,8 @@ def _get_access_token() -> str:
         headers=headers,
         json={
             "api_key": API_KEY
-        }
+        },
+        timeout=settings.PAYMENT_GATEWAY_TIMEOUT,
     )
     resp.raise_for_status()
     data = resp.json()
@@ -41,7 +42,8 @@ def create_invoice(amount):
     resp = requests.post(
         url,
         headers=headers,
-        json=body
+        json=body,
+        timeout=settings.PAYMENT_GATEWAY_TIMEOUT,
     )
     resp.raise_for_status()
     data = resp.json()
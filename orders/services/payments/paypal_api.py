@@ -20,6 +20,7 @@ def _get_access_token() -> str:
         data={"grant_type": "client_credentials"},
         auth=HTTPBasicAuth(settings.PAYPAL_CLIENT_ID, settings.PAYPAL_CLIENT_SECRET),
         headers={"Accept":"application/json","Accept-Language":"en_US"},
+        timeout=settings.PAYMENT_GATEWAY_TIMEOUT,
     )
     if resp.status_code != 200:
         raise RuntimeError(f"PayPal OAuth failed {resp.status_code}: {resp.text}")
@@ -68,7 +69,7 @@ def create_order(amount: str, currency: str, return_url: str, cancel_url: str, c
             }
         ]
     }
-    resp = requests.post(url, json=body, headers=headers, timeout=30)
+    resp = requests.post(url, json=body, headers=headers, timeout=settings.PAYMENT_GATEWAY_TIMEOUT)
     resp.raise_for_status()
     data = resp.json()
     order_id = data["id"]
@@ -91,7 +92,7 @@ def capture_order(order_id: str):
         "Content-Type": "application/json",
         "PayPal-Request-Id": request_id,
     }
-    resp = requests.post(url, headers=headers, timeout=30)
+    resp = requests.post(url, headers=headers, timeout=settings.PAYMENT_GATEWAY_TIMEOUT)
     resp.raise_for_status()
     data = resp.json()
     status = data.get("status")
@@ -6,11 +6,13 @@ import logging
 logger = logging.getLogger(__name__)
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe.default_http_client = stripe.RequestsClient(timeout=settings.PAYMENT_GATEWAY_TIMEOUT)
 
 
 class StripeGateway(BasePaymentGateway):
     method = "stripe"
     provider_name = "Stripe"
+    transport_errors = (stripe.error.APIConnectionError,)
 
     def send_payment(self, request, user, amount: Decimal, order):
         amount_cents = int(amount * 100)
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.core import signing
+from django.db.models import DecimalField, Exists, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django_redis import get_redis_connection
+from cart.models import CartItem
+from products.models import Tax
+from ..models import Coupon, Order
+
+# A quote is the priced cart kept in Redis for a few minutes so checkout
+# can reuse it instead of pricing the cart again. The client only ever
+# sees a signed id; the payload itself never leaves the server.
+DEFAULT_QUOTE_TTL = 60 * 5
+_SALT = "orders.quote"
+CENT = Decimal("0.01")
+
+
+def _key(token):
+    return f"orders:quote:{token}"
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def cart_lines(user):
+    """
+    The user's cart lines with price and vendor, in one query. Returns
+    dicts with id, cart_id, variant_id, quantity, unit_price, vendor_id
+    and store_name.
+    """
+    unit_price = Coalesce(
+        'variant__discounted_price', 'variant__price', Value(Decimal("0")),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    return list(
+        CartItem.objects
+        .filter(cart__user=user)
+        .annotate(
+            unit_price=unit_price,
+            vendor_id=F('variant__product__vendor_id'),
+            store_name=F('variant__product__vendor__vendor_profile__store_name'),
+        )
+        .order_by('variant_id')
+        .values('id', 'cart_id', 'variant_id', 'quantity', 'unit_price', 'vendor_id', 'store_name')
+    )
+
+
+def cart_fingerprint(lines):
+    """Digest of the cart contents (variants, quantities and prices) a quote was made for."""
+    content = ",".join(
+        f"{line['variant_id']}:{line['quantity']}:{line['unit_price']}"
+        for line in sorted(lines, key=lambda l: l['variant_id'])
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _split(amount, weights):
+    """Split amount across weights pro rata, giving the rounding remainder to the last share."""
+    if not weights:
+        return []
+    total = sum(weights)
+    if not total:
+        return [Decimal("0.00")] * len(weights)
+    shares = [_money(amount * weight / total) for weight in weights[:-1]]
+    return shares + [_money(amount) - sum(shares, Decimal("0"))]
+
+
+def price_cart(user, coupon_code=None, lines=None):
+    """
+    Price the user's cart: subtotal, coupon discount, taxes and the split
+    per vendor. Raises ValueError for an empty cart; coupon problems are
+    raised by Coupon.validate_and_get_discount.
+    """
+    if lines is None:
+        lines = cart_lines(user)
+    if not lines:
+        raise ValueError("Cart is empty")
+
+    subtotal = sum((line['unit_price'] * line['quantity'] for line in lines), Decimal("0"))
+
+    discount_amount = Decimal("0")
+    if coupon_code:
+        discount_amount = Coupon.validate_and_get_discount(coupon_code, user, subtotal)
+
+    total_tax = sum(
+        (tax.calculate_tax(subtotal) for tax in Tax.objects.filter(is_active=True)),
+        Decimal("0"),
+    )
+
+    # Totals are the sum of their rounded parts, as the vendor shares are.
+    subtotal, discount_amount, total_tax = _money(subtotal), _money(discount_amount), _money(total_tax)
+
+    vendors = {}
+    for line in lines:
+        vendor = vendors.setdefault(line['vendor_id'], {
+            'vendor_id': line['vendor_id'],
+            'store_name': line['store_name'],
+            'subtotal': Decimal("0"),
+        })
+        vendor['subtotal'] += line['unit_price'] * line['quantity']
+    vendors = list(vendors.values())
+
+    weights = [vendor['subtotal'] for vendor in vendors]
+    for vendor, discount, tax in zip(vendors, _split(discount_amount, weights), _split(total_tax, weights)):
+        vendor['subtotal'] = _money(vendor['subtotal'])
+        vendor['discount'] = discount
+        vendor['tax'] = tax
+        vendor['total'] = vendor['subtotal'] - discount + tax
+
+    return {
+        'coupon_code': coupon_code or None,
+        'lines': [
+            {
+                'variant_id': line['variant_id'],
+                'vendor_id': line['vendor_id'],
+                'quantity': line['quantity'],
+                'unit_price': line['unit_price'],
+                'line_total': line['unit_price'] * line['quantity'],
+            }
+            for line in lines
+        ],
+        'vendors': vendors,
+        'subtotal': subtotal,
+        'discount_amount': discount_amount,
+        'total_tax': total_tax,
+        'total_price': subtotal - discount_amount + total_tax,
+        'fingerprint': cart_fingerprint(lines),
+    }
+
+
+def _dump(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _load(payload):
+    quote = json.loads(payload)
+    for key in ('subtotal', 'discount_amount', 'total_tax', 'total_price'):
+        quote[key] = Decimal(quote[key])
+    for line in quote['lines']:
+        line['unit_price'] = Decimal(line['unit_price'])
+        line['line_total'] = Decimal(line['line_total'])
+    for vendor in quote['vendors']:
+        for key in ('subtotal', 'discount', 'tax', 'total'):
+            vendor[key] = Decimal(vendor[key])
+    return quote
+
+
+def create_quote(user, coupon_code=None):
+    """
+    Price the cart and keep the result for settings.ORDER_QUOTE_TTL
+    seconds. Returns the quote with its signed `quote_id` and `expires_in`.
+    """
+    quote = price_cart(user, coupon_code)
+    quote['user_id'] = user.pk
+    ttl = getattr(settings, "ORDER_QUOTE_TTL", DEFAULT_QUOTE_TTL)
+    token = uuid.uuid4().hex
+    get_redis_connection("default").set(_key(token), json.dumps(quote, default=_dump), ex=ttl)
+    quote['quote_id'] = signing.Signer(salt=_SALT).sign(token)
+    quote['expires_in'] = ttl
+    return quote
+
+
+def _token(quote_id):
+    try:
+        return signing.Signer(salt=_SALT).unsign(quote_id)
+    except signing.BadSignature:
+        return None
+
+
+def _coupon_still_valid(code, user):
+    """
+    Whether a quoted coupon would still pass validate_and_get_discount,
+    in one query. The subtotal, and so min_order_amount, is covered by
+    the cart fingerprint.
+    """
+    now = timezone.now()
+    return (
+        Coupon.objects
+        .filter(code=code, is_active=True)
+        .filter(Q(valid_from__isnull=True) | Q(valid_from__lte=now))
+        .filter(Q(valid_to__isnull=True) | Q(valid_to__gte=now))
+        .filter(Q(first_order_only=False) | ~Exists(Order.objects.filter(user=user)))
+        .exists()
+    )
+
+
+def get_quote(user, quote_id, coupon_code=None, lines=None):
+    """
+    The stored quote if it is still usable for this checkout: not expired,
+    issued to this user for the same coupon, the coupon is still valid,
+    and the cart has not changed since (compared against `lines` from
+    cart_lines). Otherwise None.
+    """
+    token = _token(quote_id)
+    if token is None:
+        return None
+    payload = get_redis_connection("default").get(_key(token))
+    if payload is None:
+        return None
+
+    quote = _load(payload)
+    if quote['user_id'] != user.pk or quote['coupon_code'] != (coupon_code or None):
+        return None
+    if lines is not None and quote['fingerprint'] != cart_fingerprint(lines):
+        return None
+    if quote['coupon_code'] and not _coupon_still_valid(quote['coupon_code'], user):
+        return None
+    return quote
+
+
+def discard_quote(quote_id):
+    token = _token(quote_id)
+    if token is not None:
+        get_redis_connection("default").delete(_key(token))
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Invoice, Order
+from .tasks import refresh_order_sales_task
+
+
+def schedule_order_sales_refresh(order_id):
+    transaction.on_commit(lambda: refresh_order_sales_task.delay(order_id))
+
+# -------------------- Vendor sales rollups --------------------
+@receiver(post_save, sender=Invoice)
+def refresh_sales_on_invoice(sender, instance, **kwargs):
+    # An issued invoice is what makes an order count as a sale.
+    schedule_order_sales_refresh(instance.order_id)
+
+@receiver(post_save, sender=Order)
+def refresh_sales_on_status_change(sender, instance, created, update_fields=None, **kwargs):
+    # Cancelling an invoiced order moves it to refunds.
+    if created or (update_fields is not None and 'status' not in update_fields):
+        return
+    schedule_order_sales_refresh(instance.pk)
@@ -1,6 +1,19 @@
+from datetime import timedelta
 from celery import shared_task
+from django.utils import timezone
+from .services.analytics import refresh_order_sales, refresh_vendor_sales
 from .utils import send_email
 
 @shared_task
 def send_order_email_async(mail_subject, mail_template, context):
     send_email(mail_subject, mail_template, context)
+
+@shared_task
+def refresh_order_sales_task(order_id):
+    return refresh_order_sales(order_id)
+
+@shared_task
+def refresh_recent_vendor_sales(days=2):
+    # Safety net for refreshes lost between commit and the queue.
+    today = timezone.localdate()
+    return refresh_vendor_sales(start=today - timedelta(days=days - 1), end=today + timedelta(days=1))
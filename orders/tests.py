@@ -1,3 +1,287 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User, VendorProfile
+from backend.testing import CatalogTestCase
+from cart.models import Cart, CartItem
+from products.models import Product, ProductVariant, Tax
+from products.services.inventory import InsufficientStock, decrement_stock
+from .models import (
+    Coupon, Invoice, InvoiceSequence, Order, Payment, ShippingAddress, VendorDailySales, VendorOrder,
+    VendorProductDailySales,
+)
+from .services.analytics import refresh_order_sales, refresh_vendor_sales
+from .services.invoice_service import next_invoice_number
+from .services.order_service import create_order
+from .services.payments.base import PaymentGatewayError
+from .services.payments.paymob import PaymobGateway
+from .services.pricing import cart_lines, create_quote, get_quote
 
-# Create your tests here.
+
+class QuoteReuseTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.coupon = Coupon.objects.create(code='WELCOME', discount_type=Coupon.DiscountType.PERCENT, value=10)
+
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(user=self.buyer, guest_id=None)
+        self.item = CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+
+    def reuse(self, quote, coupon_code=None):
+        return get_quote(self.buyer, quote['quote_id'], coupon_code, cart_lines(self.buyer))
+
+    def test_unchanged_cart_reuses_quote(self):
+        quote = create_quote(self.buyer, 'WELCOME')
+        self.assertEqual(quote['discount_amount'], Decimal('20.00'))
+        reused = self.reuse(quote, 'WELCOME')
+        self.assertIsNotNone(reused)
+        self.assertEqual(reused['total_price'], quote['total_price'])
+
+    def test_tampered_or_foreign_quote_is_not_reused(self):
+        quote = create_quote(self.buyer)
+        self.assertIsNone(get_quote(self.buyer, quote['quote_id'] + 'x', None, cart_lines(self.buyer)))
+        other = self.make_user('other')
+        self.assertIsNone(get_quote(other, quote['quote_id'], None, cart_lines(self.buyer)))
+
+    def test_different_coupon_is_not_reused(self):
+        quote = create_quote(self.buyer)
+        self.assertIsNone(self.reuse(quote, 'WELCOME'))
+
+    def test_changed_quantity_is_not_reused(self):
+        quote = create_quote(self.buyer)
+        CartItem.objects.filter(pk=self.item.pk).update(quantity=3)
+        self.assertIsNone(self.reuse(quote))
+
+    def test_changed_price_is_not_reused(self):
+        quote = create_quote(self.buyer)
+        ProductVariant.objects.filter(pk=self.variant.pk).update(discounted_price='80.00')
+        self.assertIsNone(self.reuse(quote))
+
+    def test_deactivated_coupon_is_not_reused(self):
+        quote = create_quote(self.buyer, 'WELCOME')
+        Coupon.objects.filter(pk=self.coupon.pk).update(is_active=False)
+        self.assertIsNone(self.reuse(quote, 'WELCOME'))
+
+    def test_expired_coupon_is_not_reused(self):
+        quote = create_quote(self.buyer, 'WELCOME')
+        Coupon.objects.filter(pk=self.coupon.pk).update(valid_to=timezone.now() - timedelta(minutes=1))
+        self.assertIsNone(self.reuse(quote, 'WELCOME'))
+
+    def test_first_order_coupon_is_not_reused_after_an_order(self):
+        Coupon.objects.filter(pk=self.coupon.pk).update(first_order_only=True)
+        quote = create_quote(self.buyer, 'WELCOME')
+        address = ShippingAddress.objects.create(
+            user=self.buyer, full_name='Buyer', phone_number='123', address_line_1='Street 1',
+            city='Cairo', postal_code='11511', country='EG',
+        )
+        Order.objects.create(user=self.buyer, shipping_address=address, total_price='10.00')
+        self.assertIsNone(self.reuse(quote, 'WELCOME'))
+
+
+class InvoiceNumberTests(TestCase):
+    def test_numbers_are_sequential(self):
+        self.assertEqual(next_invoice_number(), 'INV-000001')
+        self.assertEqual(next_invoice_number(), 'INV-000002')
+        self.assertEqual(InvoiceSequence.objects.get(scope='INV').last_value, 2)
+
+    @override_settings(INVOICE_NUMBER_PREFIX='BILL', INVOICE_NUMBER_PADDING=4)
+    def test_prefix_and_padding(self):
+        self.assertEqual(next_invoice_number(), 'BILL-0001')
+
+    @override_settings(INVOICE_NUMBER_YEARLY=True)
+    def test_yearly_numbering_restarts_each_year(self):
+        when = timezone.now()
+        next_year = when + timedelta(days=366)
+        self.assertEqual(next_invoice_number(when), f'INV-{when.year}-000001')
+        self.assertEqual(next_invoice_number(when), f'INV-{when.year}-000002')
+        self.assertEqual(next_invoice_number(next_year), f'INV-{next_year.year}-000001')
+
+
+class CheckoutTestCase(CatalogTestCase):
+    """The shared catalog plus a shipping address and 2 units in the buyer's cart."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.address = ShippingAddress.objects.create(
+            user=cls.buyer, full_name='Buyer', phone_number='123', address_line_1='Street 1',
+            city='Cairo', postal_code='11511', country='EG',
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(user=self.buyer, guest_id=None)
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+
+    def stock(self, variant=None):
+        return ProductVariant.objects.get(pk=(variant or self.variant).pk).stock
+
+
+class CheckoutPaymentTests(CheckoutTestCase):
+    def paymob(self, **kwargs):
+        return mock.patch.object(PaymobGateway, 'send_payment', autospec=True, **kwargs)
+
+    def test_payment_is_recorded_before_the_gateway_is_called(self):
+        def send_payment(gateway, request, user, amount, order):
+            self.assertEqual(Payment.objects.get(order=order).status, 'initiated')
+            return {'order_id': 'pm-1', 'transaction_id': None, 'status': 'pending'}
+
+        with self.paymob(side_effect=send_payment):
+            order, _ = create_order(self.buyer, self.address, payment_method='paymob')
+        payment = Payment.objects.get(order=order)
+        self.assertEqual((payment.status, payment.gateway_order_id), ('pending', 'pm-1'))
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+    def test_gateway_timeout_cancels_the_order(self):
+        with self.paymob(side_effect=requests.Timeout), self.assertRaises(PaymentGatewayError):
+            create_order(self.buyer, self.address, payment_method='paymob')
+        order = Order.objects.get(user=self.buyer)
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(order.payment.status, 'failed')
+        self.assertTrue(CartItem.objects.filter(cart=self.cart).exists())
+
+    def test_other_gateway_errors_are_not_reported_as_unavailable(self):
+        with self.paymob(side_effect=KeyError('order_id')), self.assertRaises(KeyError):
+            create_order(self.buyer, self.address, payment_method='paymob')
+        self.assertEqual(Order.objects.get(user=self.buyer).status, 'cancelled')
+
+    def test_paid_order_survives_a_failed_clean_up(self):
+        def send_payment(gateway, request, user, amount, order):
+            # The webhook beats the rest of checkout.
+            Payment.objects.filter(order=order).update(status='success')
+            return {'success': True, 'transaction_id': 'cod-1', 'status': 'pending'}
+
+        with mock.patch('orders.services.payments.cod.CashOnDeliveryGateway.send_payment', autospec=True, side_effect=send_payment), \
+                mock.patch('orders.services.order_service.decrement_stock', side_effect=RuntimeError):
+            order, _ = create_order(self.buyer, self.address)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment.status), ('pending', 'success'))
+
+    def test_late_success_for_a_cancelled_order_only_records_the_payment(self):
+        with self.paymob(side_effect=requests.ConnectionError), self.assertRaises(PaymentGatewayError):
+            create_order(self.buyer, self.address, payment_method='paymob')
+        order = Order.objects.get(user=self.buyer)
+        Payment.objects.filter(order=order).update(gateway_order_id='pm-1')
+
+        response = self.client.get(
+            '/api/v1/orders/payments/callback/paymob', {'id': 'tx-1', 'order': 'pm-1', 'success': 'true'},
+            HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment.status), ('cancelled', 'success'))
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(Invoice.objects.filter(order=order).exists())
+
+
+class StockShortfallTests(CheckoutTestCase):
+    """Stock is taken for every line or none; a short line fails the whole order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.case = cls.make_variant(cls.make_product('Case'), price='10.00', stock=1)
+
+    def setUp(self):
+        super().setUp()
+        CartItem.objects.create(cart=self.cart, variant=self.case, quantity=2)
+
+    def test_shortfall_takes_no_stock(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            decrement_stock([(self.variant.pk, 2), (self.case.pk, 2)])
+        self.assertEqual(raised.exception.skus, [self.case.sku])
+        self.assertEqual((self.stock(), self.stock(self.case)), (5, 1))
+
+    def test_shortfall_rolls_back_the_order(self):
+        with self.assertRaises(InsufficientStock):
+            create_order(self.buyer, self.address)
+        order = Order.objects.get(user=self.buyer)
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual((self.stock(), self.stock(self.case)), (5, 1))
+        self.assertFalse(Invoice.objects.filter(order=order).exists())
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+
+class MultiVendorCheckoutTestCase(CheckoutTestCase):
+    """A second vendor's product in the cart, with a percent coupon and tax that do not split evenly."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_vendor = cls.make_user('other-vendor', role=User.VENDOR)
+        VendorProfile.objects.create(user=cls.other_vendor, store_name='Other Store')
+        product = Product.objects.create(
+            vendor=cls.other_vendor, category=cls.category, brand=cls.brand,
+            name='Charger', condition='new', description='A charger',
+        )
+        cls.other_variant = cls.make_variant(product, price='33.33')
+        Coupon.objects.create(code='SAVE7', discount_type=Coupon.DiscountType.PERCENT, value=7)
+        Tax.objects.create(name='VAT', type=Tax.TaxType.PERCENTAGE, value=14)
+
+    def setUp(self):
+        super().setUp()
+        CartItem.objects.create(cart=self.cart, variant=self.other_variant, quantity=1)
+
+
+class VendorSplitTests(MultiVendorCheckoutTestCase):
+    def test_vendor_shares_add_up_to_the_order(self):
+        order, _ = create_order(self.buyer, self.address, coupon_code='SAVE7')
+        shares = list(VendorOrder.objects.filter(order=order).order_by('vendor_id'))
+
+        self.assertEqual([share.vendor_id for share in shares], [self.vendor.pk, self.other_vendor.pk])
+        self.assertEqual([share.subtotal for share in shares], [Decimal('200.00'), Decimal('33.33')])
+        for field, total in (
+            ('subtotal', order.subtotal), ('discount_amount', order.discount_amount),
+            ('tax', order.total_tax), ('total', order.grand_total),
+        ):
+            with self.subTest(field=field):
+                self.assertEqual(sum(getattr(share, field) for share in shares), total)
+        for share in shares:
+            self.assertEqual(share.total, share.subtotal - share.discount_amount + share.tax)
+
+
+class VendorSalesRollupTests(MultiVendorCheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order, _ = create_order(self.buyer, self.address, coupon_code='SAVE7')
+        self.day = timezone.localdate(self.order.created_at)
+
+    def rollups(self):
+        daily = VendorDailySales.objects.order_by('vendor_id', 'day').values(
+            'vendor_id', 'day', 'orders_count', 'gross_sales', 'discounts', 'tax', 'net_sales',
+            'refunds_count', 'refunded_amount',
+        )
+        products = VendorProductDailySales.objects.order_by('vendor_id', 'day', 'variant_id').values(
+            'vendor_id', 'day', 'variant_id', 'product_id', 'units_sold', 'revenue',
+            'refunded_units', 'refunded_amount',
+        )
+        return list(daily), list(products)
+
+    def test_refresh_counts_invoiced_orders_per_vendor(self):
+        refresh_order_sales(self.order.pk)
+        daily, products = self.rollups()
+
+        shares = VendorOrder.objects.filter(order=self.order).order_by('vendor_id')
+        self.assertEqual(
+            [(row['vendor_id'], row['day'], row['orders_count'], row['net_sales']) for row in daily],
+            [(share.vendor_id, self.day, 1, share.total) for share in shares],
+        )
+        self.assertEqual(
+            [(row['variant_id'], row['units_sold']) for row in products],
+            [(self.variant.pk, 2), (self.other_variant.pk, 1)],
+        )
+
+    def test_refresh_is_idempotent_for_the_same_day(self):
+        refresh_order_sales(self.order.pk)
+        expected = self.rollups()
+
+        refresh_order_sales(self.order.pk)
+        self.assertEqual(self.rollups(), expected)
+        refresh_vendor_sales(start=self.day, end=self.day + timedelta(days=1))
+        self.assertEqual(self.rollups(), expected)
+        self.assertEqual(VendorDailySales.objects.count(), 2)
@@ -8,6 +8,7 @@ from .views import (
     PublicCouponListView,
     OrderListView,
     OrderCreateView,
+    OrderQuoteView,
     OrderDetailView,
     OrderItemListView,
     PaymentDetailView,
@@ -27,6 +28,7 @@ urlpatterns = [
     
     # Orders
     path('', OrderListView.as_view()),
+    path('quote/', OrderQuoteView.as_view()),
     path('checkout/', OrderCreateView.as_view()),
     path('<int:pk>/', OrderDetailView.as_view()),
     path('<int:order_id>/items/', OrderItemListView.as_view()),
@@ -1,3 +1,4 @@
+import logging
 from django.db import transaction
 from rest_framework.generics import (
     CreateAPIView, ListCreateAPIView, RetrieveAPIView,
@@ -8,25 +9,32 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from orders.services.invoice_service import create_internal_invoice
-from products.models import Tax
+from products.services.inventory import decrement_stock
 
-from .models import Invoice, Order, OrderItem, Payment, ShippingAddress, Coupon
+from .models import (
+    Invoice, Order, OrderItem, Payment, ShippingAddress, Coupon,
+    VendorDailySales, VendorOrder, VendorProductDailySales,
+)
 from .serializers import (
-    CreateOrderSerializer, InvoiceDisplaySerializer,
+    CreateOrderSerializer, InvoiceDisplaySerializer, OrderQuoteSerializer,
     OrderItemSerializer, OrderSerializer, CouponSerializer,
     PaymentSerializer, ShippingAddressSerializer,
     VendorOrderSerializer, VendorPaymentSerializer,
-    VendorInvoiceSerializer,
+    VendorInvoiceSerializer, VendorAnalyticsQuerySerializer,
+    VendorSalesBucketSerializer, VendorSalesTotalsSerializer, VendorProductSalesSerializer,
 )
 from .services.payments.resolver import PaymentGatewayResolver
 
 from products.permissions import IsVendor
-from products.pagination import CustomPagination
-from django.db.models import Prefetch
+from products.pagination import HybridPagination
+from django.db.models import F, Prefetch, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
 from django.utils.timezone import now
 from django.conf import settings
 from .tasks import send_order_email_async
 
+logger = logging.getLogger(__name__)
+
 # -------- Shipping Addresses --------
 class ShippingAddressListCreate(ListCreateAPIView):
     permission_classes = [IsAuthenticated]
@@ -86,6 +94,14 @@ class OrderListView(ListAPIView):
                 .select_related('shipping_address', 'payment', 'user')
                 .prefetch_related('items', 'items__variant', 'items__variant__product'))
    
+class OrderQuoteView(CreateAPIView):
+    """
+    Price the cart without placing the order. The returned quote_id can
+    be passed to checkout/ while it is valid to skip pricing it again.
+    """
+    serializer_class = OrderQuoteSerializer
+    permission_classes = [IsAuthenticated]
+
 class OrderCreateView(CreateAPIView):
     serializer_class = CreateOrderSerializer
     permission_classes = [IsAuthenticated]
@@ -145,13 +161,18 @@ class PaymentCallbackView(APIView):
         # Only handle stock + invoice if successful
         if status == "success" and not hasattr(order, "invoice"):
             with transaction.atomic():
-                items = order.items.select_for_update().select_related('variant')
-                for item in items:
-                    variant = item.variant
-                    if variant.stock < item.quantity:
-                        raise ValueError(f"Not enough stock for {variant.sku}")
-                    variant.stock -= item.quantity
-                    variant.save(update_fields=['stock'])
+                # Duplicate callbacks queue on the order row; only the
+                # first one takes stock and issues the invoice. Re-read
+                # the order under the lock: checkout may have cancelled it.
+                order = Order.objects.select_for_update().select_related('user').get(pk=order.pk)
+                if order.status == 'cancelled':
+                    # The payment is recorded above; no stock or invoice
+                    # for an order that no longer exists for the shop.
+                    logger.warning("Payment %s succeeded for cancelled order #%s", payment.pk, order.pk)
+                    return Response(result)
+                if Invoice.objects.filter(order=order).exists():
+                    return Response(result)
+                decrement_stock(order.items.values_list('variant_id', 'quantity'))
 
                 create_internal_invoice(order, status='issued')
 
@@ -211,161 +232,172 @@ class InvoiceDetailView(RetrieveAPIView):
 
 
 # ---------VENDOR -----------
+def vendor_splits(vendor):
+    """The vendor's VendorOrder rows, each with the vendor's items prefetched onto its order."""
+    vendor_items = OrderItem.objects.filter(vendor=vendor).select_related("variant", "variant__product")
+    return (
+        VendorOrder.objects.filter(vendor=vendor)
+        .prefetch_related(Prefetch("order__items", queryset=vendor_items, to_attr="vendor_items"))
+    )
+
 # Orders
 class VendorOrderListView(ListAPIView):
     serializer_class = VendorOrderSerializer
     permission_classes = [IsVendor]
-    pagination_class = CustomPagination
+    pagination_class = HybridPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        vendor = self.request.user
-        
-        vendor_items = OrderItem.objects.filter(vendor=vendor).select_related(
-                "variant",
-                "variant__product",
-                "vendor"
-            )
-                
-        return (
-            Order.objects.filter(items__vendor=vendor)
-            .select_related("user", "shipping_address") 
-            .prefetch_related(Prefetch("items", queryset=vendor_items, to_attr="vendor_items"))
-            .distinct()
-            .order_by("-created_at")
-        )
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["request"] = self.request
-        context["active_taxes"] = list(Tax.objects.filter(is_active=True))
-        return context
+        return vendor_splits(self.request.user).select_related("order").order_by("-created_at")
 
 class VendorOrderDetailView(RetrieveAPIView):
     serializer_class = VendorOrderSerializer
     permission_classes = [IsVendor]
+    lookup_field = "order_id"
+    lookup_url_kwarg = "pk"
 
     def get_queryset(self):
-        vendor = self.request.user
-        vendor_items = OrderItem.objects.filter(vendor=vendor).select_related(
-                "variant",
-                "variant__product",
-                "vendor"
-            )
-        return (
-            Order.objects.filter(items__vendor=vendor)
-            .select_related("user", "shipping_address") 
-            .prefetch_related(Prefetch("items", queryset=vendor_items, to_attr="vendor_items"))
-            .distinct()
-        )
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["request"] = self.request
-        context["active_taxes"] = list(Tax.objects.filter(is_active=True))
-        return context
+        return vendor_splits(self.request.user).select_related("order")
 
 # Payments
 class VendorPaymentListView(ListAPIView):
     serializer_class = VendorPaymentSerializer
     permission_classes = [IsVendor]
-    pagination_class = CustomPagination
+    pagination_class = HybridPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         vendor = self.request.user
-        vendor_items = (
-            OrderItem.objects.filter(vendor=vendor)
-            .select_related("variant", "variant__product", "vendor")
-        )
+        # unique_vendor_order: at most one split per order, so no DISTINCT
         return (
-            Payment.objects.filter(order__items__vendor=vendor)
+            Payment.objects.filter(order__vendor_orders__vendor=vendor)
             .select_related("order")
             .prefetch_related(
-                Prefetch("order__items", queryset=vendor_items, to_attr="vendor_items")
+                Prefetch("order__vendor_orders", queryset=vendor_splits(vendor), to_attr="vendor_split")
             )
-            .distinct()
             .order_by("-created_at")
         )
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["request"] = self.request
-        context["active_taxes"] = list(Tax.objects.filter(is_active=True))
-        return context
-
 class VendorPaymentDetailView(RetrieveAPIView):
     serializer_class = VendorPaymentSerializer
     permission_classes = [IsVendor]
 
     def get_queryset(self):
         vendor = self.request.user
-        vendor_items = (
-            OrderItem.objects.filter(vendor=vendor)
-            .select_related("variant", "variant__product", "vendor")
-        )
         return (
-            Payment.objects.filter(order__items__vendor=vendor)
+            Payment.objects.filter(order__vendor_orders__vendor=vendor)
             .select_related("order")
             .prefetch_related(
-                Prefetch("order__items", queryset=vendor_items, to_attr="vendor_items")
+                Prefetch("order__vendor_orders", queryset=vendor_splits(vendor), to_attr="vendor_split")
             )
-            .distinct()
         )
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["request"] = self.request
-        context["active_taxes"] = list(Tax.objects.filter(is_active=True))
-        return context
-
 # Invoices
 class VendorInvoiceListView(ListAPIView):
     serializer_class = VendorInvoiceSerializer
     permission_classes = [IsVendor]
-    pagination_class = CustomPagination
+    pagination_class = HybridPagination
+    cursor_ordering = ('-issued_at', '-id')
 
     def get_queryset(self):
         vendor = self.request.user
-        vendor_items = (
-            OrderItem.objects.filter(vendor=vendor)
-            .select_related("variant", "variant__product", "vendor")
-        )
         return (
-            Invoice.objects.filter(order__items__vendor=vendor)
+            Invoice.objects.filter(order__vendor_orders__vendor=vendor)
             .select_related('order')
             .prefetch_related(
-                Prefetch("order__items", queryset=vendor_items, to_attr="vendor_items")
+                Prefetch("order__vendor_orders", queryset=vendor_splits(vendor), to_attr="vendor_split")
             )
-            .distinct()
             .order_by('-issued_at')
         )
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["request"] = self.request
-        context["active_taxes"] = list(Tax.objects.filter(is_active=True))
-        return context
-
 class VendorInvoiceDetailView(RetrieveAPIView):
     serializer_class = VendorInvoiceSerializer
     permission_classes = [IsVendor]
 
     def get_queryset(self):
         vendor = self.request.user
-        vendor_items = (
-            OrderItem.objects.filter(vendor=vendor)
-            .select_related("variant", "variant__product", "vendor")
-        )
         return (
-            Invoice.objects.filter(order__items__vendor=vendor)
+            Invoice.objects.filter(order__vendor_orders__vendor=vendor)
             .select_related('order')
             .prefetch_related(
-                Prefetch("order__items", queryset=vendor_items, to_attr="vendor_items")
+                Prefetch("order__vendor_orders", queryset=vendor_splits(vendor), to_attr="vendor_split")
             )
-            .distinct()
         )
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["request"] = self.request
-        context["active_taxes"] = list(Tax.objects.filter(is_active=True))
-        return context
+# Analytics
+_SALES_PERIODS = {
+    "day": F("day"),
+    "week": TruncWeek("day"),
+    "month": TruncMonth("day"),
+}
+
+class VendorSalesAnalyticsView(APIView):
+    """
+    Revenue per day, week or month from the daily rollups.
+    ?period=day|week|month&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD (default: last 30 days)
+    """
+    permission_classes = [IsVendor]
+
+    def get(self, request):
+        query = VendorAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        rows = VendorDailySales.objects.filter(
+            vendor=request.user, day__gte=params["date_from"], day__lte=params["date_to"]
+        )
+        sums = {
+            field: Sum(field)
+            for field in (
+                "orders_count", "gross_sales", "discounts", "tax",
+                "net_sales", "refunds_count", "refunded_amount",
+            )
+        }
+        series = (
+            rows.annotate(period=_SALES_PERIODS[params["period"]])
+            .values("period")
+            .annotate(**sums)
+            .order_by("period")
+        )
+        totals = {field: value or 0 for field, value in rows.aggregate(**sums).items()}
+
+        return Response({
+            "period": params["period"],
+            "date_from": params["date_from"],
+            "date_to": params["date_to"],
+            "totals": VendorSalesTotalsSerializer(totals).data,
+            "series": VendorSalesBucketSerializer(series, many=True).data,
+        })
+
+class VendorProductAnalyticsView(APIView):
+    """
+    Units sold and revenue per SKU, or per product with ?group=product,
+    best first. ?ordering=units|revenue&limit=20 plus the date range of
+    VendorSalesAnalyticsView.
+    """
+    permission_classes = [IsVendor]
+
+    def get(self, request):
+        query = VendorAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        keys = ["product_id", "product_name"]
+        if params["group"] == "sku":
+            keys += ["variant_id", "sku"]
+        ordering = "-units_sold" if params["ordering"] == "units" else "-revenue"
+
+        rows = (
+            VendorProductDailySales.objects
+            .filter(vendor=request.user, day__gte=params["date_from"], day__lte=params["date_to"])
+            .annotate(product_name=F("product__name"), sku=F("variant__sku"))
+            .values(*keys)
+            .annotate(
+                units_sold=Sum("units_sold"),
+                revenue=Sum("revenue"),
+                refunded_units=Sum("refunded_units"),
+                refunded_amount=Sum("refunded_amount"),
+            )
+            .order_by(ordering, "product_id")[:params["limit"]]
+        )
+        return Response(VendorProductSalesSerializer(rows, many=True).data)
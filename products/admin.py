@@ -9,6 +9,13 @@ from django.utils.html import format_html
 from import_export.admin import ImportExportModelAdmin
 from django.forms.models import BaseInlineFormSet
 from django.core.exceptions import ValidationError
+from backend.cache import suppress_invalidation
+
+# ---- Imports: one cache invalidation per import, not per row ----
+class CatalogImportExportAdmin(ImportExportModelAdmin):
+    def process_dataset(self, dataset, form, request, **kwargs):
+        with suppress_invalidation():
+            return super().process_dataset(dataset, form, request, **kwargs)
 
 # ---- Inline for Product Images ----
 class ProductImageInline(admin.TabularInline):
@@ -49,7 +56,7 @@ class ProductVariantInline(admin.TabularInline):
 
 # ---- Category ----
 @admin.register(Category)
-class CategoryAdmin(ImportExportModelAdmin):
+class CategoryAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'name', 'slug', 'is_active', 'created_at']
     list_editable = ['is_active']
     search_fields = ['name', 'slug']
@@ -58,7 +65,7 @@ class CategoryAdmin(ImportExportModelAdmin):
 
 # ---- Brand ----
 @admin.register(Brand)
-class BrandAdmin(ImportExportModelAdmin):
+class BrandAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'name', 'slug', 'created_at']
     search_fields = ['name', 'slug']
     prepopulated_fields = {"slug": ("name",)}
@@ -66,7 +73,7 @@ class BrandAdmin(ImportExportModelAdmin):
 
 # ---- Product ----
 @admin.register(Product)
-class ProductAdmin(ImportExportModelAdmin):
+class ProductAdmin(CatalogImportExportAdmin):
     list_display = [
         'id', 'name', 'brand', 'category', 'is_featured',
         'is_weekly_deal', 'condition', 'created_at'
@@ -81,20 +88,20 @@ class ProductAdmin(ImportExportModelAdmin):
 
 # ---- Specification ----
 @admin.register(Specification)
-class SpecificationAdmin(ImportExportModelAdmin):
+class SpecificationAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'name', 'created_at']
     search_fields = ['name']
 
 # ---- Product Specification ----
 @admin.register(ProductSpecification)
-class ProductSpecificationAdmin(ImportExportModelAdmin):
+class ProductSpecificationAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'product', 'specification', 'value']
     search_fields = ['product__name', 'specification__name', 'value']
     list_filter = ['specification']
 
 # ---- Product Image ----
 @admin.register(ProductImage)
-class ProductImageAdmin(ImportExportModelAdmin):
+class ProductImageAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'product', 'url', 'is_primary', 'alt_text', 'caption']
     list_filter = ['is_primary']
     search_fields = ['product__name', 'alt_text', 'caption']
@@ -106,14 +113,14 @@ class ProductImageAdmin(ImportExportModelAdmin):
     image_tag.short_description = 'Image'
     
 @admin.register(ProductVariant)
-class ProductVariantAdmin(ImportExportModelAdmin):
+class ProductVariantAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'product', 'sku', 'price', 'discounted_price', 'stock', 'is_default', 'created_at']
     search_fields = ['product__name', 'sku']
     list_filter = ['product', 'is_default']
     readonly_fields = ['created_at', 'updated_at']
     
 @admin.register(VariantSpecification)
-class VariantSpecificationAdmin(ImportExportModelAdmin):
+class VariantSpecificationAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'variant', 'specification', 'value']
     search_fields = ['variant__product__name', 'specification__name', 'value']
     list_filter = ['specification']
@@ -121,7 +128,7 @@ class VariantSpecificationAdmin(ImportExportModelAdmin):
 
 # ---- Tax ----
 @admin.register(Tax)
-class TaxAdmin(ImportExportModelAdmin):
+class TaxAdmin(CatalogImportExportAdmin):
     list_display = ['id', 'name', 'value', 'type', 'is_active', 'created_at']
     search_fields = ['name']
     list_filter = ['type', 'is_active']
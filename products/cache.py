@@ -0,0 +1,95 @@
+import time
+from django.core.cache import cache
+from backend.cache import CATEGORIES, PRODUCTS, versioned_key
+from .models import Product
+
+# Bump when the serialized shape of a widget changes so old payloads
+# are never served by new code.
+WIDGET_CACHE_VERSION = 1
+WIDGET_TIMEOUT = 60 * 60
+# Payloads are kept this long past their refresh time so that a single
+# worker recomputes while everyone else keeps serving the old bytes.
+WIDGET_STALE_GRACE = 60 * 5
+LOCK_TIMEOUT = 10
+LOCK_WAIT_STEPS = 20
+LOCK_WAIT_INTERVAL = 0.05
+
+LATEST_PRODUCTS = "latest_products"
+WEEKLY_DEAL = "weekly_deal_product"
+CATEGORY_LIST = "category_list"
+SUBCATEGORY_LIST = "subcategory_list"
+
+# Cache namespaces each widget is built from; writes to any of them make
+# the widget's key move to a new generation.
+WIDGET_NAMESPACES = {
+    LATEST_PRODUCTS: (PRODUCTS, CATEGORIES),
+    WEEKLY_DEAL: (PRODUCTS, CATEGORIES),
+    CATEGORY_LIST: (CATEGORIES,),
+    SUBCATEGORY_LIST: (CATEGORIES,),
+}
+
+
+def product_namespace(product_id):
+    # Per-product generation for data the listing card does not carry
+    # (specs, variant specs, reviews).
+    return f"product:{product_id}"
+
+
+def product_id_for_slug(slug):
+    """
+    Primary key for a product slug, or None. Cached per PRODUCTS
+    generation (any product save moves it), so validators can find a
+    product's namespace without a query.
+    """
+    key = versioned_key(f"product:slug:{slug}", PRODUCTS)
+    pk = cache.get(key)
+    if pk is None:
+        pk = Product.objects.filter(slug=slug).values_list('pk', flat=True).first() or 0
+        cache.set(key, pk, timeout=WIDGET_TIMEOUT)
+    return pk or None
+
+
+def widget_key(name):
+    return versioned_key(f"widget:v{WIDGET_CACHE_VERSION}:{name}", *WIDGET_NAMESPACES[name])
+
+
+def _build(key, builder, timeout):
+    payload = builder()
+    fresh_until = time.time() + timeout
+    cache.set(key, (payload, fresh_until), timeout=timeout + WIDGET_STALE_GRACE)
+    return payload
+
+
+def get_widget(name, builder, timeout=WIDGET_TIMEOUT):
+    """
+    Return the rendered payload for a homepage widget.
+    `builder` returns the final response bytes (or None for "no content").
+    Only one worker rebuilds a widget at a time; the others serve the
+    stale payload or wait briefly for the rebuild on a cold cache.
+    """
+    key = widget_key(name)
+    lock_key = f"{key}:lock"
+    entry = cache.get(key)
+
+    if entry is not None:
+        payload, fresh_until = entry
+        if time.time() < fresh_until or not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            return payload
+        try:
+            return _build(key, builder, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        try:
+            return _build(key, builder, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    for _ in range(LOCK_WAIT_STEPS):
+        time.sleep(LOCK_WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return builder()
+
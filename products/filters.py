@@ -1,13 +1,87 @@
 import django_filters
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Coalesce
+from rest_framework import filters
 from .models import Product
+from .services.search import search_products
 
 class ProductFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(field_name='name', lookup_expr='iexact')
     brand = django_filters.CharFilter(field_name='brand__name', lookup_expr='iexact')
     category = django_filters.CharFilter(field_name='category__name', lookup_expr='iexact')
-    price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
-    price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    price_min = django_filters.NumberFilter(field_name='effective_price', lookup_expr='gte')
+    price_max = django_filters.NumberFilter(field_name='effective_price', lookup_expr='lte')
+    rating_min = django_filters.NumberFilter(field_name='rating_summary__avg_rating', lookup_expr='gte')
 
     class Meta:
         model = Product
-        fields = ['name', 'brand', 'category', 'price_min', 'price_max']
+        fields = ['name', 'brand', 'category', 'price_min', 'price_max', 'rating_min']
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    Maps public ordering names onto the denormalized columns that back them,
+    e.g. ?ordering=-price sorts on Product.effective_price.
+    """
+    ordering_aliases = {
+        'price': 'effective_price',
+    }
+    # Orderings on related columns are annotated onto the row so cursor
+    # pagination can read positions straight off each instance.
+    ordering_annotations = {
+        'rating': Coalesce(F('rating_summary__avg_rating'), Value(0.0), output_field=FloatField()),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        resolved = []
+        for term in ordering:
+            prefix = '-' if term.startswith('-') else ''
+            field = term.lstrip('-')
+            resolved.append(prefix + self.ordering_aliases.get(field, field))
+        # Prices and ratings tie often; id makes the order total, which
+        # cursor pagination needs to page through ties without skipping
+        # or repeating rows. It follows the leading key's direction so
+        # (effective_price, id) can be scanned either way.
+        if not any(term.lstrip('-') in ('id', 'pk') for term in resolved):
+            resolved.append('-id' if resolved[0].startswith('-') else 'id')
+        return resolved
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        annotations = {
+            name: expression for name, expression in self.ordering_annotations.items()
+            if any(term.lstrip('-') == name for term in ordering)
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset.order_by(*ordering)
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text product search on Product.search_vector.
+    ?q=<terms> (or the legacy ?search=) filters on the GIN index and,
+    unless an explicit ordering is requested, ranks results by ts_rank.
+    """
+    search_params = ['q', 'search']
+
+    def get_search_terms(self, request):
+        for param in self.search_params:
+            terms = request.query_params.get(param, '').strip()
+            if terms:
+                return terms
+        return None
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        queryset = search_products(queryset, terms)
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset
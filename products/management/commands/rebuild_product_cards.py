@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from products.models import Product
+from products.services.product_card import rebuild_product_cards
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized product card rows used by catalog listings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=int, help="Only rebuild cards for this vendor id.")
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['vendor']:
+            queryset = queryset.filter(vendor_id=options['vendor'])
+        count = rebuild_product_cards(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} product cards."))
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_product_cards(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductCard = apps.get_model('products', 'ProductCard')
+    ProductImage = apps.get_model('products', 'ProductImage')
+
+    cards = []
+    products = Product.objects.select_related('brand', 'category').prefetch_related('variants')
+    for product in products.iterator(chunk_size=500):
+        variants = sorted(product.variants.all(), key=lambda v: (not v.is_default, v.id))
+        image = (ProductImage.objects
+                 .filter(product_id=product.pk, variant__isnull=True)
+                 .order_by('-is_primary', 'id')
+                 .first())
+        default_variant = variants[0] if variants else None
+        prices = [v.discounted_price or v.price for v in variants]
+        cards.append(ProductCard(
+            product_id=product.pk,
+            default_variant=default_variant,
+            price=default_variant.price if default_variant else None,
+            discounted_price=default_variant.discounted_price if default_variant else None,
+            min_price=min(prices) if prices else None,
+            max_price=max(prices) if prices else None,
+            primary_image=image.url.name if image else '',
+            primary_image_alt=image.alt_text if image else None,
+            brand_name=product.brand.name,
+            brand_slug=product.brand.slug,
+            category_name=product.category.name,
+            category_slug=product.category.slug,
+        ))
+    ProductCard.objects.bulk_create(cards, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_remove_brand_vendor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='products.product')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('discounted_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('primary_image', models.ImageField(blank=True, upload_to='')),
+                ('primary_image_alt', models.CharField(blank=True, max_length=255, null=True)),
+                ('brand_name', models.CharField(max_length=50)),
+                ('brand_slug', models.SlugField(max_length=100)),
+                ('category_name', models.CharField(max_length=50)),
+                ('category_slug', models.SlugField(max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('default_variant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productvariant')),
+            ],
+        ),
+        migrations.RunPython(backfill_product_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_effective_price(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    default_price = (
+        ProductVariant.objects
+        .filter(product=OuterRef('pk'))
+        .order_by('-is_default', 'id')
+        .annotate(effective=Coalesce('discounted_price', 'price'))
+        .values('effective')[:1]
+    )
+    Product.objects.update(effective_price=Subquery(default_price))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_productcard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text="Default variant's discounted price, or its price. Kept in sync from variant signals.", max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'effective_price'], name='products_pr_categor_120f74_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['brand', 'effective_price'], name='products_pr_brand_i_61042b_idx'),
+        ),
+        migrations.RunPython(backfill_effective_price, migrations.RunPython.noop),
+    ]
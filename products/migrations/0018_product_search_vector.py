@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:36
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+BACKFILL_SEARCH_VECTORS = """
+    UPDATE products_product AS p
+    SET search_vector =
+        setweight(to_tsvector('english', coalesce(p.name, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(v.sku, ' ')
+            FROM products_productvariant AS v
+            WHERE v.product_id = p.id
+        ), '')), 'A')
+        || setweight(to_tsvector('english', b.name), 'B')
+        || setweight(to_tsvector('english', c.name), 'C')
+        || setweight(to_tsvector('english', coalesce(p.description, '')), 'D')
+    FROM products_brand AS b, products_category AS c
+    WHERE b.id = p.brand_id AND c.id = p.category_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_product_effective_price'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='products_pr_search__98d711_gin'),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTORS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKFILL_RATING_SUMMARIES = """
+    INSERT INTO products_productratingsummary (
+        product_id, review_count, rating_sum, avg_rating,
+        r1, r2, r3, r4, r5, updated_at
+    )
+    SELECT
+        p.id,
+        COUNT(r.id),
+        COALESCE(SUM(r.rating), 0),
+        COALESCE(AVG(r.rating), 0),
+        COUNT(*) FILTER (WHERE r.rating = 1),
+        COUNT(*) FILTER (WHERE r.rating = 2),
+        COUNT(*) FILTER (WHERE r.rating = 3),
+        COUNT(*) FILTER (WHERE r.rating = 4),
+        COUNT(*) FILTER (WHERE r.rating = 5),
+        NOW()
+    FROM products_product AS p
+    LEFT JOIN products_productreview AS r
+        ON r.product_id = p.id AND r.parent_id IS NULL AND r.rating IS NOT NULL
+    GROUP BY p.id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0020_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='products.product')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('avg_rating', models.FloatField(default=0)),
+                ('r1', models.PositiveIntegerField(default=0)),
+                ('r2', models.PositiveIntegerField(default=0)),
+                ('r3', models.PositiveIntegerField(default=0)),
+                ('r4', models.PositiveIntegerField(default=0)),
+                ('r5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['avg_rating'], name='products_pr_avg_rat_4faf73_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_RATING_SUMMARIES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:19
+
+from django.db import migrations, models
+
+
+def backfill_card_images(apps, schema_editor):
+    ProductCard = apps.get_model('products', 'ProductCard')
+    ProductImage = apps.get_model('products', 'ProductImage')
+
+    images = {}
+    rows = (ProductImage.objects
+            .filter(variant__isnull=True)
+            .order_by('product_id', '-is_primary', 'id')
+            .values('product_id', 'url', 'alt_text', 'caption', 'is_primary'))
+    for row in rows.iterator(chunk_size=2000):
+        images.setdefault(row.pop('product_id'), []).append(row)
+
+    cards = []
+    for card in ProductCard.objects.filter(product_id__in=images).only('pk').iterator(chunk_size=500):
+        card.images = images[card.pk]
+        cards.append(card)
+    ProductCard.objects.bulk_update(cards, ['images'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_product_price_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcard',
+            name='images',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill_card_images, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='productcard',
+            name='primary_image',
+        ),
+        migrations.RemoveField(
+            model_name='productcard',
+            name='primary_image_alt',
+        ),
+    ]
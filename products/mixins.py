@@ -0,0 +1,44 @@
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for read endpoints.
+
+    Views implement `get_validators()` returning `(version, last_modified)`
+    from cache generations, never from the database or the serialized
+    body. `version` is hashed with the path and the normalized query
+    string (so pages, filters and ordering get distinct tags, whatever
+    order the parameters come in); `last_modified` may be None. Matching
+    If-None-Match / If-Modified-Since requests get a 304 without running
+    the view.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        version, last_modified = self.get_validators()
+        if version is None:
+            return super().get(request, *args, **kwargs)
+
+        query = urlencode(sorted(
+            (name, value) for name, values in request.GET.lists() for value in values
+        ))
+        etag = quote_etag(
+            hashlib.md5(f"{request.path}?{query}|{version}".encode()).hexdigest()
+        )
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.headers['ETag'] = etag
+            if timestamp is not None:
+                response.headers['Last-Modified'] = http_date(timestamp)
+        return response
@@ -2,6 +2,8 @@ import uuid
 from decimal import Decimal
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from django.db.models import Q
 from django.conf import settings
@@ -36,6 +38,10 @@ class Category(models.Model):
     class Meta:
         verbose_name = 'category'
         verbose_name_plural = 'categories'
+        indexes = [
+            # Typo-tolerant autocomplete (pg_trgm)
+            GinIndex(fields=['name'], name='category_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
         
     def __str__(self):
         return self.name
@@ -52,6 +58,12 @@ class Brand(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Typo-tolerant autocomplete (pg_trgm)
+            GinIndex(fields=['name'], name='brand_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
+    
     def __str__(self):
         return self.name
         
@@ -87,9 +99,33 @@ class Product(models.Model):
     is_featured = models.BooleanField(default=False)
     is_weekly_deal = models.BooleanField(default=False)
     weekly_deal_expires = models.DateTimeField(null=True, blank=True)
+    effective_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Default variant's discounted price, or its price. Kept in sync from variant signals."
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination on the public catalog and vendor product lists
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['vendor', 'created_at']),
+            # Price range filters and price sorting within a category / brand
+            models.Index(fields=['category', 'effective_price']),
+            models.Index(fields=['brand', 'effective_price']),
+            # Keyset pagination on price across the whole catalog
+            models.Index(fields=['effective_price', 'id']),
+            GinIndex(fields=['search_vector']),
+            # Typo-tolerant autocomplete (pg_trgm)
+            GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
+    
     def __str__(self):
         return f"{self.brand} {self.name}"
     
@@ -206,6 +242,36 @@ class ProductImage(models.Model):
             raise ValidationError({"variant": "Selected variant must belong to the chosen product."})
 
 
+class ProductCard(models.Model):
+    """
+    Denormalized listing row for a product. Holds everything a product card
+    needs so catalog pages can be served from a single query. Rows are
+    refreshed from signals on Product, ProductVariant and ProductImage.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    default_variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    discounted_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    # Product-level images, primary first: [{url, alt_text, caption, is_primary}]
+    images = models.JSONField(default=list, blank=True)
+    brand_name = models.CharField(max_length=50)
+    brand_slug = models.SlugField(max_length=100)
+    category_name = models.CharField(max_length=50)
+    category_slug = models.SlugField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Card({self.product_id})"
+
+
 class ProductReview(models.Model):
     class Rating(models.IntegerChoices):
         ONE = 1, "1"
@@ -250,6 +316,37 @@ class ProductReview(models.Model):
         return f"{self.user} - {self.product}"
 
 
+class ProductRatingSummary(models.Model):
+    """
+    Running totals of top-level review ratings for a product. Kept current
+    with F() updates from ProductReview signals and reconciled periodically
+    by products.tasks.reconcile_rating_summaries.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0)
+    r1 = models.PositiveIntegerField(default=0)
+    r2 = models.PositiveIntegerField(default=0)
+    r3 = models.PositiveIntegerField(default=0)
+    r4 = models.PositiveIntegerField(default=0)
+    r5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Listing sort and ?rating_min= filter
+            models.Index(fields=['avg_rating']),
+        ]
+
+    def __str__(self):
+        return f"Rating({self.product_id}): {self.avg_rating:.2f} / {self.review_count}"
+
+    @property
+    def distribution(self):
+        return [self.r1, self.r2, self.r3, self.r4, self.r5]
+
+
 class Tax(models.Model):
     class TaxType(models.TextChoices):
         PERCENTAGE = "percentage", "Percentage"
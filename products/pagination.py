@@ -1,6 +1,14 @@
+import hashlib
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination, CursorPagination
 from rest_framework.response import Response
 
+APPROXIMATE_COUNT_TIMEOUT = 60
+
 class CustomPagination(PageNumberPagination):
     page_size = 10
     page_query_param = 'page'
@@ -20,6 +28,102 @@ class CustomPagination(PageNumberPagination):
         })
 
 
+def approximate_count(queryset):
+    """
+    Row count without a full COUNT(*) where possible.
+    - Unfiltered querysets use the planner estimate in pg_class.reltuples.
+    - Filtered querysets run COUNT(*) once and cache it briefly.
+    """
+    query = queryset.query
+    if not query.where and not query.distinct:
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been analyzed
+        if row and row[0] >= 0:
+            return row[0]
+
+    sql, params = query.sql_with_params()
+    cache_key = "count:" + hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, timeout=APPROXIMATE_COUNT_TIMEOUT)
+    return count
+
+
+class ApproximateCountPaginator(DjangoPaginator):
+    @cached_property
+    def count(self):
+        return approximate_count(self.object_list)
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        # Views without an OrderingFilter can pin their own indexed keys.
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, queryset, view)
+        # Cursor positions cannot encode NULL, so rows without a value
+        # for the leading key are left out in cursor mode.
+        field = ordering[0].lstrip('-')
+        try:
+            nullable = queryset.model._meta.get_field(field).null
+        except FieldDoesNotExist:
+            nullable = False
+        if nullable:
+            queryset = queryset.filter(**{f"{field}__isnull": False})
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'meta': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+            },
+            'data': data
+        })
+
+
+class HybridPagination(CustomPagination):
+    """
+    Page-number pagination with two opt-ins for large lists:
+    - ?cursor=... or ?pagination=cursor switches to keyset pagination
+      (no COUNT, no OFFSET).
+    - ?count=approx serves 'total' from table statistics or a cached count.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor':
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+        self.approximate_count = request.query_params.get('count') == 'approx'
+        if self.approximate_count:
+            self.django_paginator_class = ApproximateCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        if self.approximate_count:
+            response.data['meta']['total_is_approximate'] = True
+        return response
+
+
 class RelatedLimitOffset(LimitOffsetPagination):
     default_limit = 4
     max_limit = 24
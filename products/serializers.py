@@ -1,4 +1,6 @@
+from django.db import models
 from rest_framework import serializers
+from cart.wishlist import wishlisted_variants
 from .models import (
     Category,
     Brand,
@@ -7,6 +9,7 @@ from .models import (
     Specification,
     ProductSpecification,
     ProductImage,
+    ProductCard,
     VariantSpecification,
     ProductReview
 )
@@ -77,8 +80,8 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     price_range = serializers.SerializerMethodField()
     selected_variant = serializers.SerializerMethodField()
     
-    avg_rating = serializers.FloatField(read_only=True)
-    review_count = serializers.IntegerField(read_only=True)
+    avg_rating = serializers.FloatField(source='rating_summary.avg_rating', read_only=True, default=0.0)
+    review_count = serializers.IntegerField(source='rating_summary.review_count', read_only=True, default=0)
     rating_distribution = serializers.SerializerMethodField()
     
     class Meta:
@@ -117,35 +120,79 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(list)
     def get_rating_distribution(self, obj):
-        # Only if you added r1..r5 in the queryset
-        if hasattr(obj, "r1"):
-            return [obj.r1, obj.r2, obj.r3, obj.r4, obj.r5]
-        return None
+        summary = getattr(obj, 'rating_summary', None)
+        return summary.distribution if summary else [0, 0, 0, 0, 0]
 
-class ProductVariantSerializer(serializers.ModelSerializer):
+class ProductCardPriceSerializer(serializers.ModelSerializer):
     class Meta:
-        model = ProductVariant
+        model = ProductCard
         fields = ['price', 'discounted_price']
 
 # Product List Serializer
+# Reads everything from the denormalized ProductCard, so querysets only
+# need select_related('card').
 class ProductSerializer(serializers.ModelSerializer):
-    images = ProductImageSerializer(source='primary_images', many=True, read_only=True)
+    brand = serializers.CharField(source='card.brand_name', read_only=True, default=None)
+    category = serializers.SlugField(source='card.category_slug', read_only=True, default=None)
+    images = serializers.SerializerMethodField()
     default_variant = serializers.SerializerMethodField()
+    price_range = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = [
-            'name', 'slug', 'description', 'images', 'default_variant'
+            'name', 'slug', 'description', 'brand', 'category',
+            'images', 'default_variant', 'price_range'
         ]
+
+    @extend_schema_field(ProductImageSerializer(many=True))
+    def get_images(self, obj):
+        card = getattr(obj, 'card', None)
+        if card is None:
+            return []
+        # Unsaved instances, so URLs come out exactly as for stored images.
+        images = [ProductImage(**image) for image in card.images]
+        return ProductImageSerializer(images, many=True, context=self.context).data
         
-    @extend_schema_field(ProductVariantSerializer)
+    @extend_schema_field(ProductCardPriceSerializer)
     def get_default_variant(self, obj):
-        variants = list(obj.variants.all())
-        variant = next((v for v in variants if v.is_default), None) or (variants[0] if variants else None)
-        if variant:
-            return ProductVariantSerializer(variant).data
-        return None
+        card = getattr(obj, 'card', None)
+        if card is None or card.default_variant_id is None:
+            return None
+        return ProductCardPriceSerializer(card).data
 
+    @extend_schema_field(dict)
+    def get_price_range(self, obj):
+        card = getattr(obj, 'card', None)
+        if card is None or card.min_price is None:
+            return None
+        return {
+            'min': str(card.min_price),
+            'max': str(card.max_price)
+        }
+
+class ProductListingListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        products = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        # Wishlist hearts for the whole page in one Redis pipeline.
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        self.child.wishlisted = wishlisted_variants(user, [
+            getattr(getattr(product, 'card', None), 'default_variant_id', None) for product in products
+        ]) if user is not None else set()
+        return super().to_representation(products)
+
+class ProductListingSerializer(ProductSerializer):
+    in_wishlist = serializers.SerializerMethodField()
+    
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['in_wishlist']
+        list_serializer_class = ProductListingListSerializer
+    
+    @extend_schema_field(bool)
+    def get_in_wishlist(self, obj):
+        card = getattr(obj, 'card', None)
+        return card is not None and card.default_variant_id in getattr(self, 'wishlisted', ())
 
 class ReviewReplySerializer(serializers.ModelSerializer):
     user = serializers.CharField(source="user.username", read_only=True)
@@ -0,0 +1,111 @@
+import hashlib
+from django.core.cache import cache
+from backend.cache import CATEGORIES, PRODUCTS, versioned_key
+from django.db import connection
+
+FACET_CACHE_TIMEOUT = 60 * 2
+
+# Upper bounds of the price buckets; anything above the last one
+# falls into an open-ended "2500+" bucket.
+PRICE_BUCKETS = (50, 100, 250, 500, 1000, 2500)
+
+_PRICE_BUCKET_SQL = "width_bucket(p.effective_price, ARRAY[{}]::numeric[])".format(
+    ', '.join(str(bound) for bound in PRICE_BUCKETS)
+)
+
+# facet name -> (value expression, label expression)
+FACET_COLUMNS = {
+    'brand': ('b.slug', 'b.name'),
+    'category': ('c.slug', 'c.name'),
+    'condition': ('p.condition', 'p.condition'),
+    'price': (_PRICE_BUCKET_SQL, _PRICE_BUCKET_SQL),
+}
+
+# Query params that change the page, not the result set.
+_IGNORED_PARAMS = {'page', 'page_size', 'cursor', 'ordering', 'facets', 'count'}
+
+_FACETS_SQL = """
+    SELECT {columns}, COUNT(*)
+    FROM products_product AS p
+    JOIN products_brand AS b ON b.id = p.brand_id
+    JOIN products_category AS c ON c.id = p.category_id
+    WHERE p.id IN ({ids})
+    GROUP BY GROUPING SETS ({grouping_sets})
+"""
+
+
+def parse_facets(value):
+    if not value:
+        return []
+    requested = [name.strip() for name in value.split(',')]
+    return [name for name in FACET_COLUMNS if name in requested]
+
+
+def filter_signature(query_params):
+    items = sorted(
+        (key, value)
+        for key in query_params
+        if key not in _IGNORED_PARAMS
+        for value in query_params.getlist(key)
+    )
+    return hashlib.md5(repr(items).encode()).hexdigest()
+
+
+def _price_label(bucket):
+    if bucket is None:
+        return None
+    lower = PRICE_BUCKETS[bucket - 1] if bucket > 0 else 0
+    if bucket >= len(PRICE_BUCKETS):
+        return f"{lower}+"
+    return f"{lower}-{PRICE_BUCKETS[bucket]}"
+
+
+def compute_facets(queryset, names):
+    """
+    Count products per value of each requested facet over the filtered
+    queryset, using one GROUPING SETS query.
+    """
+    ids_sql, ids_params = queryset.order_by().values('pk').query.sql_with_params()
+
+    columns, grouping_sets = [], []
+    for name in names:
+        value, label = FACET_COLUMNS[name]
+        columns += [value, label, f"GROUPING({value})"]
+        grouping_sets.append(f"({value}, {label})")
+
+    sql = _FACETS_SQL.format(
+        columns=', '.join(columns),
+        ids=ids_sql,
+        grouping_sets=', '.join(grouping_sets),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ids_params)
+        rows = cursor.fetchall()
+
+    facets = {name: [] for name in names}
+    for row in rows:
+        count = row[-1]
+        for index, name in enumerate(names):
+            value, label, grouped = row[index * 3: index * 3 + 3]
+            if grouped == 0:
+                if value is None:
+                    break
+                if name == 'price':
+                    label = _price_label(value)
+                facets[name].append({'value': value, 'label': label, 'count': count})
+                break
+
+    for values in facets.values():
+        values.sort(key=lambda facet: -facet['count'])
+    return facets
+
+
+def get_facets(queryset, names, query_params):
+    cache_key = versioned_key(
+        f"facets:{','.join(names)}:{filter_signature(query_params)}", PRODUCTS, CATEGORIES
+    )
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = compute_facets(queryset, names)
+        cache.set(cache_key, facets, timeout=FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,49 @@
+from collections import Counter
+from django.db import connection, transaction
+from backend.cache import invalidate
+from backend.db import values_table
+from ..cache import product_namespace
+from ..models import ProductVariant
+
+_DECREMENT_STOCK_SQL = """
+    UPDATE products_productvariant AS p
+    SET stock = p.stock - x.quantity
+    FROM {values}
+    WHERE p.id = x.variant_id AND p.stock >= x.quantity
+    RETURNING p.id, p.product_id
+"""
+
+
+class InsufficientStock(ValueError):
+    def __init__(self, skus):
+        self.skus = skus
+        super().__init__(f"Not enough stock for {', '.join(skus)}")
+
+
+def decrement_stock(lines):
+    """
+    Take stock for (variant_id, quantity) lines in one conditional UPDATE.
+    Either every line is decremented or none is: on a shortfall the
+    savepoint rolls back and InsufficientStock names the short variants.
+    """
+    quantities = Counter()
+    for variant_id, quantity in lines:
+        quantities[variant_id] += quantity
+    if not quantities:
+        return
+
+    values, params = values_table(
+        'x', [('variant_id', 'integer'), ('quantity', 'integer')], sorted(quantities.items())
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_DECREMENT_STOCK_SQL.format(values=values), params)
+            updated = cursor.fetchall()
+
+        if len(updated) != len(quantities):
+            short = set(quantities) - {variant_id for variant_id, _ in updated}
+            skus = ProductVariant.objects.filter(pk__in=short).order_by('pk').values_list('sku', flat=True)
+            raise InsufficientStock(list(skus) or [str(pk) for pk in sorted(short)])
+
+    # A raw UPDATE sends no post_save, so bump the cached detail pages here.
+    invalidate(*{product_namespace(product_id) for _, product_id in updated})
@@ -0,0 +1,66 @@
+from django.db import transaction
+from ..models import Product, ProductCard, ProductImage, ProductVariant
+
+
+def refresh_product_card(product_id):
+    """
+    Rebuild the denormalized card row for one product.
+    Removes the card if the product no longer exists.
+    """
+    product = Product.objects.select_related('brand', 'category').filter(pk=product_id).first()
+    if product is None:
+        ProductCard.objects.filter(product_id=product_id).delete()
+        return None
+
+    variants = list(
+        ProductVariant.objects
+        .filter(product_id=product_id)
+        .order_by('-is_default', 'id')
+        .only('id', 'price', 'discounted_price', 'is_default')
+    )
+    images = list(
+        ProductImage.objects
+        .filter(product_id=product_id, variant__isnull=True)
+        .order_by('-is_primary', 'id')
+        .values('url', 'alt_text', 'caption', 'is_primary')
+    )
+
+    default_variant = variants[0] if variants else None
+    prices = [v.discounted_price or v.price for v in variants]
+
+    effective_price = prices[0] if prices else None
+    if product.effective_price != effective_price:
+        # update() so no signals fire and updated_at is left alone
+        Product.objects.filter(pk=product_id).update(effective_price=effective_price)
+
+    card, _ = ProductCard.objects.update_or_create(
+        product_id=product_id,
+        defaults={
+            'default_variant': default_variant,
+            'price': default_variant.price if default_variant else None,
+            'discounted_price': default_variant.discounted_price if default_variant else None,
+            'min_price': min(prices) if prices else None,
+            'max_price': max(prices) if prices else None,
+            'images': images,
+            'brand_name': product.brand.name,
+            'brand_slug': product.brand.slug,
+            'category_name': product.category.name,
+            'category_slug': product.category.slug,
+        }
+    )
+    return card
+
+
+def schedule_product_card_refresh(product_id):
+    # Run after commit so cascaded deletes have finished and the
+    # card is rebuilt from committed rows only.
+    transaction.on_commit(lambda: refresh_product_card(product_id))
+
+
+def rebuild_product_cards(queryset=None):
+    queryset = queryset if queryset is not None else Product.objects.all()
+    count = 0
+    for product_id in queryset.values_list('pk', flat=True).iterator():
+        refresh_product_card(product_id)
+        count += 1
+    return count
@@ -0,0 +1,105 @@
+from collections import defaultdict
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+from backend.cache import RATINGS, invalidate
+from ..cache import product_namespace
+from ..models import ProductRatingSummary
+
+# Recomputes summaries from the reviews table. Rows that already match
+# are left untouched, so the statement doubles as a drift check.
+_RECONCILE_SQL = """
+    INSERT INTO products_productratingsummary AS s (
+        product_id, review_count, rating_sum, avg_rating,
+        r1, r2, r3, r4, r5, updated_at
+    )
+    SELECT
+        p.id,
+        COUNT(r.id),
+        COALESCE(SUM(r.rating), 0),
+        COALESCE(AVG(r.rating), 0),
+        COUNT(*) FILTER (WHERE r.rating = 1),
+        COUNT(*) FILTER (WHERE r.rating = 2),
+        COUNT(*) FILTER (WHERE r.rating = 3),
+        COUNT(*) FILTER (WHERE r.rating = 4),
+        COUNT(*) FILTER (WHERE r.rating = 5),
+        NOW()
+    FROM products_product AS p
+    LEFT JOIN products_productreview AS r
+        ON r.product_id = p.id AND r.parent_id IS NULL AND r.rating IS NOT NULL
+    {condition}
+    GROUP BY p.id
+    ON CONFLICT (product_id) DO UPDATE SET
+        review_count = EXCLUDED.review_count,
+        rating_sum = EXCLUDED.rating_sum,
+        avg_rating = EXCLUDED.avg_rating,
+        r1 = EXCLUDED.r1, r2 = EXCLUDED.r2, r3 = EXCLUDED.r3,
+        r4 = EXCLUDED.r4, r5 = EXCLUDED.r5,
+        updated_at = EXCLUDED.updated_at
+    WHERE (s.review_count, s.rating_sum, s.r1, s.r2, s.r3, s.r4, s.r5)
+        IS DISTINCT FROM (EXCLUDED.review_count, EXCLUDED.rating_sum,
+                          EXCLUDED.r1, EXCLUDED.r2, EXCLUDED.r3, EXCLUDED.r4, EXCLUDED.r5)
+"""
+
+
+def reconcile_rating_summaries(product_id=None):
+    """
+    Rebuild rating summaries from the reviews table, for one product or
+    all of them. Returns the number of rows created or repaired.
+    """
+    condition, params = ("WHERE p.id = %s", [product_id]) if product_id else ("", [])
+    with connection.cursor() as cursor:
+        cursor.execute(_RECONCILE_SQL.format(condition=condition), params)
+        repaired = cursor.rowcount
+    if repaired:
+        invalidate(RATINGS, *([product_namespace(product_id)] if product_id else []))
+    return repaired
+
+
+def rating_contribution(review):
+    # Only top-level reviews carry a rating; replies never count.
+    if review is None or review.parent_id is not None or review.rating is None:
+        return None
+    return review.product_id, review.rating
+
+
+def apply_rating_change(old=None, new=None, rebuild_missing=True):
+    """
+    Move a review's contribution from `old` to `new`, each a
+    (product_id, rating) pair or None, using F() arithmetic so
+    concurrent reviews never overwrite each other. A missing summary row
+    is rebuilt from the reviews table unless rebuild_missing is False.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for contribution, sign in ((old, -1), (new, 1)):
+        if contribution is None:
+            continue
+        product_id, rating = contribution
+        delta = deltas[product_id]
+        delta['review_count'] += sign
+        delta['rating_sum'] += sign * rating
+        delta[f'r{rating}'] += sign
+
+    for product_id, delta in deltas.items():
+        delta = {field: value for field, value in delta.items() if value}
+        if not delta:
+            continue
+        count = F('review_count') + delta.get('review_count', 0)
+        total = F('rating_sum') + delta.get('rating_sum', 0)
+        updated = ProductRatingSummary.objects.filter(product_id=product_id).update(
+            **{field: F(field) + value for field, value in delta.items()},
+            avg_rating=Coalesce(
+                Cast(total, FloatField()) / NullIf(count, Value(0)),
+                Value(0.0),
+                output_field=FloatField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated:
+            # Raw updates send no post_save; rating filters and ordering
+            # on listings hang off this generation.
+            invalidate(RATINGS)
+        elif rebuild_missing:
+            # No summary row yet; build it from the reviews table.
+            reconcile_rating_summaries(product_id)
@@ -0,0 +1,123 @@
+import time
+from django.conf import settings
+from django_redis import get_redis_connection
+
+# Time-boxed stock holds kept in Redis, so adding to a cart never locks
+# the ProductVariant row. Per variant:
+#   stock:holds:<id>      hash  holder -> held quantity, plus "_total"
+#   stock:holds:<id>:exp  zset  holder -> expiry timestamp
+# and stock:holds:index lists variants that currently have holds, for the
+# reaper. A holder is one cart (see holder_for).
+
+DEFAULT_RESERVATION_TTL = 60 * 15
+INDEX_KEY = "stock:holds:index"
+
+# Shared by both scripts: drop expired holds and take them off the total.
+_REAP_LUA = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, holder in ipairs(expired) do
+    local qty = tonumber(redis.call('HGET', KEYS[1], holder) or '0')
+    redis.call('HDEL', KEYS[1], holder)
+    redis.call('HINCRBY', KEYS[1], '_total', -qty)
+end
+if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+end
+"""
+
+# ARGV: now, holder, wanted, stock, ttl, variant_id
+# Sets the holder's hold to min(wanted, stock - holds of everyone else)
+# and returns the granted quantity. wanted = 0 releases the hold.
+_RESERVE_SCRIPT = _REAP_LUA + """
+local own = tonumber(redis.call('HGET', KEYS[1], ARGV[2]) or '0')
+local total = tonumber(redis.call('HGET', KEYS[1], '_total') or '0')
+local available = tonumber(ARGV[4]) - (total - own)
+local granted = math.max(0, math.min(tonumber(ARGV[3]), available))
+if granted > 0 then
+    redis.call('HSET', KEYS[1], ARGV[2], granted)
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) + tonumber(ARGV[5]), ARGV[2])
+    redis.call('SADD', KEYS[3], ARGV[6])
+else
+    redis.call('HDEL', KEYS[1], ARGV[2])
+    redis.call('ZREM', KEYS[2], ARGV[2])
+end
+redis.call('HINCRBY', KEYS[1], '_total', granted - own)
+return granted
+"""
+
+# ARGV: now, variant_id. Returns the number of holds still active.
+_REAP_SCRIPT = _REAP_LUA + """
+local active = redis.call('ZCARD', KEYS[2])
+if active == 0 then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    redis.call('SREM', KEYS[3], ARGV[2])
+end
+return active
+"""
+
+
+def _keys(variant_id):
+    return [f"stock:holds:{variant_id}", f"stock:holds:{variant_id}:exp", INDEX_KEY]
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def cart_holder(cart_id):
+    return f"cart:{cart_id}"
+
+
+def holder_for(cart):
+    if getattr(cart, "is_guest", False):
+        return f"guest:{cart.guest_id}"
+    return cart_holder(cart.pk)
+
+
+def reserve_many(holder, wanted):
+    """
+    Set `holder`'s hold on each variant to the wanted quantity
+    ([(variant, quantity), ...], replacing any previous hold) and return
+    the granted quantities in the same order: at most the variant's stock
+    minus the active holds of other holders. One round trip.
+    """
+    ttl = getattr(settings, "STOCK_RESERVATION_TTL", DEFAULT_RESERVATION_TTL)
+    now = time.time()
+    pipe = _redis().pipeline(transaction=False)
+    for variant, quantity in wanted:
+        pipe.eval(
+            _RESERVE_SCRIPT, 3, *_keys(variant.pk),
+            now, holder, max(quantity, 0), max(variant.stock or 0, 0), ttl, variant.pk,
+        )
+    return pipe.execute()
+
+
+def reserve(variant, holder, quantity):
+    return reserve_many(holder, [(variant, quantity)])[0]
+
+
+def release(holder, variant_ids):
+    """Drop `holder`'s holds on the given variants (e.g. after checkout)."""
+    ttl = getattr(settings, "STOCK_RESERVATION_TTL", DEFAULT_RESERVATION_TTL)
+    redis = _redis()
+    pipe = redis.pipeline(transaction=False)
+    for variant_id in variant_ids:
+        pipe.eval(_RESERVE_SCRIPT, 3, *_keys(variant_id), time.time(), holder, 0, 0, ttl, variant_id)
+    pipe.execute()
+
+
+def held_quantity(variant_id):
+    """Units of a variant currently held by carts (expired holds may linger until reaped)."""
+    return max(int(_redis().hget(_keys(variant_id)[0], "_total") or 0), 0)
+
+
+def reap_expired_holds():
+    """Release expired holds on every variant that has any. Returns the variants visited."""
+    redis = _redis()
+    now = time.time()
+    visited = 0
+    for variant_id in redis.sscan_iter(INDEX_KEY, count=500):
+        variant_id = int(variant_id)
+        redis.eval(_REAP_SCRIPT, 3, *_keys(variant_id), now, variant_id)
+        visited += 1
+    return visited
@@ -0,0 +1,122 @@
+import hashlib
+from django.core.cache import cache
+from backend.cache import CATEGORIES, PRODUCTS, versioned_key
+from django.db import connection, transaction
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Lookup, Q
+from ..models import Brand, Category, Product
+
+SEARCH_CONFIG = 'english'
+SUGGEST_CACHE_TIMEOUT = 60
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_MAX_LENGTH = 64
+
+# Weights: name / variant SKUs (A) > brand (B) > category (C) > description (D).
+# Written in SQL so a brand or category rename refreshes every affected
+# product in one statement.
+_UPDATE_SEARCH_VECTOR_SQL = """
+    UPDATE products_product AS p
+    SET search_vector =
+        setweight(to_tsvector(%(config)s, coalesce(p.name, '')), 'A')
+        || setweight(to_tsvector(%(config)s, coalesce((
+            SELECT string_agg(v.sku, ' ')
+            FROM products_productvariant AS v
+            WHERE v.product_id = p.id
+        ), '')), 'A')
+        || setweight(to_tsvector(%(config)s, b.name), 'B')
+        || setweight(to_tsvector(%(config)s, c.name), 'C')
+        || setweight(to_tsvector(%(config)s, coalesce(p.description, '')), 'D')
+    FROM products_brand AS b, products_category AS c
+    WHERE b.id = p.brand_id AND c.id = p.category_id {condition}
+"""
+
+_CONDITIONS = {
+    'product_id': 'AND p.id = %(product_id)s',
+    'brand_id': 'AND p.brand_id = %(brand_id)s',
+    'category_id': 'AND p.category_id = %(category_id)s',
+}
+
+
+def update_search_vectors(**lookup):
+    """
+    Recompute search vectors for one product, brand or category
+    (update_search_vectors(product_id=1)), or for every product when
+    called without arguments.
+    """
+    condition = ' '.join(_CONDITIONS[key] for key in lookup)
+    params = {'config': SEARCH_CONFIG, **lookup}
+    with connection.cursor() as cursor:
+        cursor.execute(_UPDATE_SEARCH_VECTOR_SQL.format(condition=condition), params)
+        return cursor.rowcount
+
+
+def schedule_search_vector_refresh(**lookup):
+    transaction.on_commit(lambda: update_search_vectors(**lookup))
+
+
+def search_products(queryset, terms):
+    """
+    Filter a Product queryset by full-text match and annotate ts_rank
+    as search_rank. Uses the GIN index on search_vector.
+    """
+    query = SearchQuery(terms, search_type='websearch', config=SEARCH_CONFIG)
+    return (
+        queryset
+        .filter(search_vector=query)
+        .annotate(search_rank=SearchRank(F('search_vector'), query))
+    )
+
+
+def normalize_prefix(prefix):
+    return ' '.join(prefix.lower().split())[:SUGGEST_MAX_LENGTH]
+
+
+class _ILikeContains(Lookup):
+    """
+    Case-insensitive substring match written as a plain ILIKE. Django's
+    icontains compiles to UPPER(name) LIKE ..., which the gin_trgm_ops
+    index on name cannot serve.
+    """
+
+    def get_prep_lookup(self):
+        return f"%{connection.ops.prep_for_like_query(self.rhs)}%"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", (*lhs_params, *rhs_params)
+
+
+def _suggest_names(queryset, prefix, limit):
+    # A plain ILIKE (not icontains, see _ILikeContains) and the
+    # word-similarity operator (<%) are both served by the gin_trgm_ops
+    # index on name, so the OR becomes a BitmapOr of two index scans.
+    return list(
+        queryset
+        .filter(Q(_ILikeContains(F('name'), prefix)) | Q(name__trigram_word_similar=prefix))
+        .annotate(similarity=TrigramWordSimilarity(prefix, 'name'))
+        .order_by('-similarity', 'name')
+        .values('name', 'slug')[:limit]
+    )
+
+
+def suggest(prefix, limit=5):
+    """
+    Autocomplete suggestions for products, brands and categories.
+    Results are cached briefly per normalized prefix.
+    """
+    prefix = normalize_prefix(prefix)
+    if len(prefix) < SUGGEST_MIN_LENGTH:
+        return {'products': [], 'brands': [], 'categories': []}
+
+    digest = hashlib.md5(prefix.encode()).hexdigest()
+    cache_key = versioned_key(f"suggest:{limit}:{digest}", PRODUCTS, CATEGORIES)
+    result = cache.get(cache_key)
+    if result is None:
+        result = {
+            'products': _suggest_names(Product.objects.all(), prefix, limit),
+            'brands': _suggest_names(Brand.objects.all(), prefix, limit),
+            'categories': _suggest_names(Category.objects.filter(is_active=True), prefix, limit),
+        }
+        cache.set(cache_key, result, timeout=SUGGEST_CACHE_TIMEOUT)
+    return result
@@ -1,14 +1,110 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import Product, Category
+from django.utils import timezone
+from .models import (
+    Brand, Product, Category, ProductCard, ProductImage, ProductRatingSummary, ProductReview,
+    ProductSpecification, ProductVariant, VariantSpecification,
+)
+from .services.product_card import schedule_product_card_refresh
+from .services.search import schedule_search_vector_refresh
+from .services.ratings import apply_rating_change, rating_contribution
+from backend.cache import CATEGORIES, PRODUCTS, invalidate
+from .cache import product_namespace
 
+# -------------------- Product cards --------------------
+@receiver(post_save, sender=Product)
+def refresh_card_on_product_save(sender, instance, **kwargs):
+    schedule_product_card_refresh(instance.pk)
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=ProductImage)
+def refresh_card_on_child_change(sender, instance, **kwargs):
+    schedule_product_card_refresh(instance.product_id)
+
+@receiver(post_save, sender=Brand)
+def sync_card_brand(sender, instance, created, **kwargs):
+    if not created:
+        ProductCard.objects.filter(product__brand=instance).update(
+            brand_name=instance.name, brand_slug=instance.slug, updated_at=timezone.now()
+        )
+
+@receiver(post_save, sender=Category)
+def sync_card_category(sender, instance, created, **kwargs):
+    if not created:
+        ProductCard.objects.filter(product__category=instance).update(
+            category_name=instance.name, category_slug=instance.slug, updated_at=timezone.now()
+        )
+
+# -------------------- Rating summaries --------------------
+@receiver(post_save, sender=Product)
+def create_rating_summary(sender, instance, created, **kwargs):
+    if created:
+        ProductRatingSummary.objects.get_or_create(product=instance)
+
+@receiver(pre_save, sender=ProductReview)
+def remember_previous_rating(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = ProductReview.objects.filter(pk=instance.pk).only('product_id', 'parent_id', 'rating').first()
+    instance._previous_rating = rating_contribution(previous)
+
+@receiver(post_save, sender=ProductReview)
+def update_rating_summary_on_save(sender, instance, **kwargs):
+    apply_rating_change(getattr(instance, '_previous_rating', None), rating_contribution(instance))
+    instance._previous_rating = rating_contribution(instance)
+
+@receiver(post_delete, sender=ProductReview)
+def update_rating_summary_on_delete(sender, instance, origin=None, **kwargs):
+    # When the product itself is deleted its summary goes with it.
+    if isinstance(origin, Product):
+        return
+    # Never recreate a summary from a delete: a missing row means the
+    # product (and its summary) is on its way out.
+    apply_rating_change(rating_contribution(instance), None, rebuild_missing=False)
+
+# -------------------- Search vectors --------------------
+@receiver(post_save, sender=Product)
+def refresh_search_on_product_save(sender, instance, **kwargs):
+    schedule_search_vector_refresh(product_id=instance.pk)
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def refresh_search_on_variant_change(sender, instance, **kwargs):
+    # variant SKUs are part of the product's search document
+    schedule_search_vector_refresh(product_id=instance.product_id)
+
+@receiver(post_save, sender=Brand)
+def refresh_search_on_brand_save(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_vector_refresh(brand_id=instance.pk)
+
+@receiver(post_save, sender=Category)
+def refresh_search_on_category_save(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_vector_refresh(category_id=instance.pk)
+
+# -------------------- Cache generations --------------------
+# Bumps run on commit, after the card refreshes
+# above, so nothing is recached from stale cards.
 @receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Brand)
 def ivalidate_product_cache(sender, **kwargs):
-    cache.delete("latest_products")
-    cache.delete("weekly_deal_product")
+    invalidate(PRODUCTS)
 
 @receiver([post_save, post_delete], sender=Category)
 def ivalidate_category_cache(sender, **kwargs):
-    cache.delete("category_list")
-    cache.delete("subcategory_list")
+    invalidate(CATEGORIES)
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=ProductSpecification)
+@receiver([post_save, post_delete], sender=ProductReview)
+def invalidate_product_detail(sender, instance, **kwargs):
+    invalidate(product_namespace(instance.product_id))
+
+@receiver([post_save, post_delete], sender=VariantSpecification)
+def invalidate_variant_detail(sender, instance, **kwargs):
+    product_id = ProductVariant.objects.filter(pk=instance.variant_id).values_list('product_id', flat=True).first()
+    if product_id is not None:
+        invalidate(product_namespace(product_id))
@@ -0,0 +1,17 @@
+import logging
+from celery import shared_task
+from .services.ratings import reconcile_rating_summaries
+from .services.reservations import reap_expired_holds
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def reconcile_rating_summaries_task():
+    repaired = reconcile_rating_summaries()
+    if repaired:
+        logger.warning("Repaired %s product rating summaries", repaired)
+    return repaired
+
+@shared_task
+def reap_expired_stock_holds():
+    return reap_expired_holds()
@@ -1,3 +1,159 @@
-from django.test import TestCase
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from backend.testing import CatalogTestCase
+from .filters import ProductOrderingFilter
+from .models import Brand, Category, Product, ProductImage, ProductRatingSummary, ProductReview
+from .services.ratings import reconcile_rating_summaries
+from .views import ProductListAPIView
 
-# Create your tests here.
+
+class RatingSummaryTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.buyers = [cls.buyer, cls.make_user('buyer1'), cls.make_user('buyer2')]
+
+    def summary(self, product):
+        return ProductRatingSummary.objects.get(product=product)
+
+    def test_summary_created_with_product(self):
+        product = self.make_product('Tablet')
+        summary = self.summary(product)
+        self.assertEqual((summary.review_count, summary.avg_rating), (0, 0))
+
+    def test_review_create_update_delete(self):
+        product = self.make_product('Tablet')
+        first = ProductReview.objects.create(user=self.buyers[0], product=product, content='ok', rating=4)
+        ProductReview.objects.create(user=self.buyers[1], product=product, content='great', rating=5)
+        summary = self.summary(product)
+        self.assertEqual((summary.review_count, summary.rating_sum, summary.r4, summary.r5), (2, 9, 1, 1))
+        self.assertAlmostEqual(summary.avg_rating, 4.5)
+
+        first.rating = 2
+        first.save()
+        summary = self.summary(product)
+        self.assertEqual((summary.review_count, summary.rating_sum, summary.r2, summary.r4), (2, 7, 1, 0))
+
+        first.delete()
+        summary = self.summary(product)
+        self.assertEqual((summary.review_count, summary.rating_sum, summary.r2), (1, 5, 0))
+        self.assertAlmostEqual(summary.avg_rating, 5.0)
+
+    def test_replies_do_not_count(self):
+        product = self.make_product('Tablet')
+        review = ProductReview.objects.create(user=self.buyers[0], product=product, content='ok', rating=3)
+        ProductReview.objects.create(user=self.vendor, product=product, parent=review, content='thanks')
+        self.assertEqual(self.summary(product).review_count, 1)
+
+    def test_delete_product_with_reviews(self):
+        product = self.make_product('Tablet')
+        for buyer, rating in zip(self.buyers, (1, 4, 5)):
+            ProductReview.objects.create(user=buyer, product=product, content='review', rating=rating)
+
+        product_id = product.pk
+        product.delete()
+        self.assertFalse(ProductRatingSummary.objects.filter(product_id=product_id).exists())
+        # FK checks are deferred to commit, which TestCase never reaches.
+        connection.check_constraints()
+
+    def test_delete_review_without_summary_does_not_recreate_it(self):
+        product = self.make_product('Tablet')
+        review = ProductReview.objects.create(user=self.buyers[0], product=product, content='ok', rating=4)
+        ProductRatingSummary.objects.filter(product=product).delete()
+        review.delete()
+        self.assertFalse(ProductRatingSummary.objects.filter(product=product).exists())
+
+    def test_reconcile_repairs_drift(self):
+        product = self.make_product('Tablet')
+        ProductReview.objects.create(user=self.buyers[0], product=product, content='ok', rating=4)
+        ProductRatingSummary.objects.filter(product=product).update(review_count=7, rating_sum=1)
+        self.assertEqual(reconcile_rating_summaries(product.pk), 1)
+        summary = self.summary(product)
+        self.assertEqual((summary.review_count, summary.rating_sum), (1, 4))
+        self.assertEqual(reconcile_rating_summaries(product.pk), 0)
+
+
+class ProductListTests(CatalogTestCase):
+    def test_not_modified_needs_no_query(self):
+        etag = self.client.get('/api/v1/products/?ordering=-price&page=1', HTTP_HOST='localhost').headers['ETag']
+        for url in ('/api/v1/products/?ordering=-price&page=1', '/api/v1/products/?page=1&ordering=-price'):
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_detail_and_reviews_not_modified_need_no_query(self):
+        for url in (f'/api/v1/products/{self.product.slug}/', f'/api/v1/products/{self.product.slug}/reviews/'):
+            etag = self.client.get(url, HTTP_HOST='localhost').headers['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_new_review_changes_rating_ordered_listing_etag(self):
+        url = '/api/v1/products/?ordering=-rating'
+        etag = self.client.get(url, HTTP_HOST='localhost').headers['ETag']
+        self.assertEqual(self.client.get(url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductReview.objects.create(user=self.buyer, product=self.product, content='great', rating=5)
+        response = self.client.get(url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_price_ordering_breaks_ties_on_id(self):
+        view = ProductListAPIView()
+        for ordering, expected in (('price', ['effective_price', 'id']), ('-price', ['-effective_price', '-id'])):
+            request = Request(APIRequestFactory().get('/', {'ordering': ordering}))
+            self.assertEqual(ProductOrderingFilter().get_ordering(request, Product.objects.all(), view), expected)
+
+    def test_listing_images_keep_the_product_image_shape(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, url='products/side.jpg', caption='Side')
+            ProductImage.objects.create(product=self.product, url='products/front.jpg', alt_text='Front', is_primary=True)
+            ProductImage.objects.create(product=self.product, variant=self.variant, url='products/variant.jpg')
+
+        images = self.client.get('/api/v1/products/', HTTP_HOST='localhost').json()['data'][0]['images']
+        self.assertEqual(images, [
+            {'url': 'http://localhost/media/products/front.jpg', 'alt_text': 'Front', 'caption': None, 'is_primary': True},
+            {'url': 'http://localhost/media/products/side.jpg', 'alt_text': None, 'caption': 'Side', 'is_primary': False},
+        ])
+
+
+class ProductFacetTests(CatalogTestCase):
+    url = '/api/v1/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        # Listing prices are set when the product cards refresh, on commit.
+        with cls.captureOnCommitCallbacks(execute=True):
+            super().setUpTestData()
+            zeta = Brand.objects.create(name='Zeta')
+            tablets = Category.objects.create(name='Tablets', vendor=cls.vendor)
+            cls.make_variant(cls.make_product('Case'), price='30.00')
+            for name, price in (('Tablet', '300.00'), ('Monitor', '2500.00'), ('Laptop', '3000.00')):
+                cls.make_variant(cls.make_product(name, category=tablets, brand=zeta), price=price)
+
+    def facets(self, query):
+        response = self.client.get(f'{self.url}?{query}', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return {
+            name: {facet['label']: facet['count'] for facet in values}
+            for name, values in response.data['facets'].items()
+        }
+
+    def test_counts_per_brand_category_and_price_bucket(self):
+        self.assertEqual(self.facets('facets=brand,category,price'), {
+            'brand': {'Zeta': 3, 'Acme': 2},
+            'category': {'Tablets': 3, 'Phones': 2},
+            'price': {'2500+': 2, '0-50': 1, '100-250': 1, '250-500': 1},
+        })
+
+    def test_counts_follow_the_filters(self):
+        self.assertEqual(self.facets('brand=zeta&facets=price'), {
+            'price': {'2500+': 2, '250-500': 1},
+        })
+
+    def test_facets_are_opt_in(self):
+        response = self.client.get(self.url, HTTP_HOST='localhost')
+        self.assertNotIn('facets', response.data)
+        self.assertEqual(self.facets('facets=unknown,condition'), {'condition': {'new': 5}})
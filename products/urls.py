@@ -9,6 +9,9 @@ urlpatterns = [
     path("latest/", views.LatestProductListAPIView.as_view()),
     path("weekly-deal/", views.WeeklyDealProductAPIView.as_view()),
     
+    # Search
+    path("suggest/", views.ProductSuggestAPIView.as_view()),
+    
     path("<slug:slug>/", views.ProductDetailAPIView.as_view()),
     path("related/<slug:slug>/", views.RelatedProductListAPIView.as_view()),
     
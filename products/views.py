@@ -1,5 +1,4 @@
-from django.db.models import Avg, Count, Prefetch, Q
-from django.db.models.functions import Coalesce
+from django.db.models import Prefetch
 from rest_framework import generics, viewsets
 from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
@@ -13,6 +12,7 @@ from .models import (
 from .serializers import (
     ProductReviewSerializer,
     ProductSerializer,
+    ProductListingSerializer,
     ProductDetailSerializer,
     CategorySerializer,
     BrandSerializer,
@@ -23,52 +23,100 @@ from .serializers import (
     VendorVariantSpecificationSerializer,
     VendorCategorySerializer,
 )
-from .pagination import CustomPagination, RelatedLimitOffset, ReviewCursorPagination
-from django.core.cache import cache
+from .pagination import CustomPagination, HybridPagination, RelatedLimitOffset, ReviewCursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from .filters import ProductFilter
+from .filters import ProductFilter, ProductOrderingFilter, ProductSearchFilter
 from rest_framework import filters
 from rest_framework.exceptions import NotFound, PermissionDenied
 from django.utils.functional import cached_property
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import JSONRenderer
+from django.http import HttpResponse
+from .cache import (
+    CATEGORY_LIST, LATEST_PRODUCTS, SUBCATEGORY_LIST, WEEKLY_DEAL,
+    get_widget, product_id_for_slug, product_namespace,
+)
+from .mixins import ConditionalGetMixin
+from backend.cache import CATEGORIES, PRODUCTS, RATINGS, get_generations
+from cart.wishlist import wishlist_namespace
+from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
+from .services.search import suggest
+from .services.facets import get_facets, parse_facets
 
 # -------------------- Products --------------------
-class ProductListAPIView(generics.ListAPIView):
-    serializer_class = ProductSerializer
-    pagination_class = CustomPagination
+class ProductListAPIView(ConditionalGetMixin, generics.ListAPIView):
+    serializer_class = ProductListingSerializer
+    pagination_class = HybridPagination
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter
+        ProductSearchFilter,
+        ProductOrderingFilter
     ]
     filterset_class = ProductFilter
-    search_fields = ['name', 'description', 'brand__name', 'category__name', 'sku']
-    ordering_fields = ['price', 'created_at']
+    ordering_fields = ['price', 'created_at', 'rating']
     
     def get_queryset(self):
-        return Product.objects.select_related(
-            'category', 'brand'
-        ).prefetch_related(
-            'specs__specification', 'category__children', 
-            Prefetch('variants', queryset=ProductVariant.objects.order_by('-is_default', 'id')),
-            Prefetch(
-                'images',
-                queryset=(
-                    ProductImage.objects
-                    .filter(variant__isnull=True)
-                    .order_by('-is_primary')
-                ),
-                to_attr='primary_images'
-            ),
-        )
+        # Cards are denormalized, so a listing page is a single query.
+        return Product.objects.select_related('card')
+    
+    def get_validators(self):
+        # Cards move with PRODUCTS (products, variants, images, brands) and
+        # CATEGORIES, rating filters and ordering with RATINGS; together
+        # with the query string they identify the page without a query.
+        # Hearts are per user, so signed-in users add their wishlist
+        # generation.
+        namespaces = [PRODUCTS, CATEGORIES, RATINGS]
+        user = self.request.user
+        if user.is_authenticated:
+            namespaces.append(wishlist_namespace(user.pk))
+        generations = get_generations(*namespaces)
+        return ":".join(f"{ns}{generations[ns]}" for ns in namespaces), None
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # ?facets=brand,category,condition,price adds per-value counts
+        facets = parse_facets(request.query_params.get('facets'))
+        if facets and isinstance(response.data, dict):
+            queryset = self.filter_queryset(self.get_queryset())
+            response.data['facets'] = get_facets(queryset, facets, request.query_params)
+        return response
+
+class ProductSuggestAPIView(APIView):
+    """
+    Lightweight autocomplete for the search box. Skips serializers,
+    pagination and prefetching; returns names and slugs only.
+    """
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'suggest'
+    default_limit = 5
+    max_limit = 10
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, self.max_limit))
+        return Response(suggest(request.query_params.get('q', ''), limit=limit))
 
-class ProductDetailAPIView(generics.RetrieveAPIView):
+class ProductDetailAPIView(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = ProductDetailSerializer
     lookup_field = 'slug'
     
+    def get_validators(self):
+        pk = product_id_for_slug(self.kwargs['slug'])
+        if pk is None:
+            return None, None
+        # Specs, stock and reviews move the product's own generation.
+        namespaces = [PRODUCTS, CATEGORIES, RATINGS, product_namespace(pk)]
+        generations = get_generations(*namespaces)
+        return ":".join(f"{ns}{generations[ns]}" for ns in namespaces), None
+    
     def get_queryset(self):
         return Product.objects.select_related(
-            'category', 'brand'
+            'category', 'brand', 'rating_summary'
         ).prefetch_related(
             'specs__specification', 'category__children',
             Prefetch(
@@ -88,16 +136,7 @@ class ProductDetailAPIView(generics.RetrieveAPIView):
                     .order_by('-is_default', 'id')
                 )
             ),
-        ).annotate(
-                avg_rating=Coalesce(Avg("reviews__rating"), 0.0),
-                review_count=Count("reviews", distinct=True),
-                # star distribution
-                r1=Count("reviews", filter=Q(reviews__rating=1)),
-                r2=Count("reviews", filter=Q(reviews__rating=2)),
-                r3=Count("reviews", filter=Q(reviews__rating=3)),
-                r4=Count("reviews", filter=Q(reviews__rating=4)),
-                r5=Count("reviews", filter=Q(reviews__rating=5)),
-            )
+        )
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -122,73 +161,65 @@ class RelatedProductListAPIView(generics.ListAPIView):
         return (Product.objects
                 .filter(category=product.category)
                 .exclude(id=product.id)
-                .select_related("brand")
-                .prefetch_related(
-                    Prefetch(
-                        "images",
-                        queryset=(
-                            ProductImage.objects
-                            .filter(variant__isnull=True)
-                            .order_by("-is_primary")
-                        ),
-                        to_attr="primary_images"
-                    ),
-                    Prefetch("variants", queryset=ProductVariant.objects.order_by('-is_default','id'))
-                )
+                .select_related("card")
                 .order_by("-is_featured", "-created_at")
                 )
          
 
 # -------------------- Home Page Views --------------------
+# Homepage widgets cache their final JSON bytes, so a warm request
+# touches neither the database nor the serializers.
+def render_widget(serializer):
+    return JSONRenderer().render(serializer.data)
+
 class LatestProductListAPIView(generics.ListAPIView):
     serializer_class = ProductSerializer
     
-    def get_queryset(self):
-        products = cache.get("latest_products")
-        
-        if products is None:
-            products = Product.objects.prefetch_related('images').order_by('-created_at')[:9]
-            cache.set("latest_products", products, timeout=60*60)
-            
-        return products
+    def list(self, request, *args, **kwargs):
+        def build():
+            products = Product.objects.select_related('card').order_by('-created_at')[:9]
+            return render_widget(self.get_serializer(products, many=True))
+
+        payload = get_widget(LATEST_PRODUCTS, build)
+        return HttpResponse(payload, content_type='application/json')
 
 class WeeklyDealProductAPIView(generics.RetrieveAPIView):
     serializer_class = ProductSerializer
     
-    def get_object(self):
-        now = timezone.now()
-        product = cache.get("weekly_deal_product")
-        
-        if product is None:
+    def retrieve(self, request, *args, **kwargs):
+        def build():
             product = (
                 Product.objects
-                .filter(is_weekly_deal=True,weekly_deal_expires__gte=now)
-                .prefetch_related('images')
+                .filter(is_weekly_deal=True, weekly_deal_expires__gte=timezone.now())
+                .select_related('card')
                 .order_by('weekly_deal_expires')
                 .first()
             )
-            
             if not product:
-                from rest_framework.exceptions import NotFound
-                raise NotFound("No active weekly deal.")
-            cache.set("weekly_deal_product", product, timeout=60*60)
+                return None
+            return render_widget(self.get_serializer(product))
 
-        return product 
+        payload = get_widget(WEEKLY_DEAL, build)
+        if payload is None:
+            raise NotFound("No active weekly deal.")
+        return HttpResponse(payload, content_type='application/json')
         
     ## Most Popular Products
 
 # -------------------- Categories & Brands --------------------   
-class CategoryListAPIView(generics.ListAPIView):
+class CategoryListAPIView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = CategorySerializer
     
-    def get_queryset(self):
-        categories = cache.get("category_list")
-        
-        if categories is None:
+    def get_validators(self):
+        return get_generations(CATEGORIES)[CATEGORIES], None
+    
+    def list(self, request, *args, **kwargs):
+        def build():
             categories = Category.objects.filter(parent__isnull=True, is_active=True).prefetch_related('children')[:9]
-            cache.set("category_list", categories, timeout=60*60)
+            return render_widget(self.get_serializer(categories, many=True))
 
-        return categories
+        payload = get_widget(CATEGORY_LIST, build)
+        return HttpResponse(payload, content_type='application/json')
  
 class SubcategoryListByCategoryAPIView(generics.ListAPIView):
     serializer_class = CategorySerializer
@@ -200,25 +231,36 @@ class SubcategoryListByCategoryAPIView(generics.ListAPIView):
 class SubCategoryListAPIView(generics.ListAPIView):
     serializer_class = CategorySerializer
     
-    def get_queryset(self):
-        categories = cache.get("subcategory_list")
-        
-        if categories is None:
-            categories = Category.objects.filter(parent__isnull=False)[:9]
-            cache.set("subcategory_list", categories, timeout=60*60)
-            
-        return categories 
+    def list(self, request, *args, **kwargs):
+        def build():
+            categories = Category.objects.filter(parent__isnull=False).prefetch_related('children')[:9]
+            return render_widget(self.get_serializer(categories, many=True))
+
+        payload = get_widget(SUBCATEGORY_LIST, build)
+        return HttpResponse(payload, content_type='application/json')
     
-class BrandListAPIView(generics.ListAPIView):
+class BrandListAPIView(ConditionalGetMixin, generics.ListAPIView):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
 
+    def get_validators(self):
+        # Brand writes bump PRODUCTS (cards carry the brand name).
+        return get_generations(PRODUCTS)[PRODUCTS], None
+
 # -------------------- Reviews --------------------
-class ProductReviewListAPIView(generics.ListCreateAPIView):
+class ProductReviewListAPIView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = ProductReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = ReviewCursorPagination
     
+    def get_validators(self):
+        # Reviews and replies move the product's generation.
+        pk = product_id_for_slug(self.kwargs['slug'])
+        if pk is None:
+            return None, None
+        namespace = product_namespace(pk)
+        return get_generations(namespace)[namespace], None
+    
     @cached_property
     def product(self):
         try:
@@ -282,7 +324,8 @@ class ProductReviewDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 class VendorProductViewSet(viewsets.ModelViewSet):
     serializer_class = VendorProductSerializer
     permission_classes = [IsVendor, IsVendorOwner]
-    pagination_class = CustomPagination
+    pagination_class = HybridPagination
+    cursor_ordering = ('-created_at', '-id')
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,